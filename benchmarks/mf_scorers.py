@@ -0,0 +1,97 @@
+"""
+    Compares MF scorers: nmslib (HNSW) and exact matrix product.
+    Exact scorer results are ground truth for recall@k.
+
+    Usage: python -m benchmarks.mf_scorers --users 2000 --k 10
+"""
+import argparse
+import time
+import typing as tp
+
+import numpy as np
+import yaml
+
+from service.utils.matrix_factorization.scorers import SCORERS
+
+PATH_CONFIG_MF = "./service/config/inference-MF.cfg.yml"
+
+
+def _latency(scorer, vectors: np.ndarray, k: int) -> tp.Dict[str, float]:
+    timings = []
+    for vector in vectors:
+        started_at = time.perf_counter()
+        scorer.query_batch(vector[None, :], k)
+        timings.append(time.perf_counter() - started_at)
+
+    return {
+        "p50_ms": 1000 * float(np.percentile(timings, 50)),
+        "p99_ms": 1000 * float(np.percentile(timings, 99)),
+    }
+
+
+def _throughput(scorer, vectors: np.ndarray, k: int, batch_size: int):
+    started_at = time.perf_counter()
+    recs = []
+    for start in range(0, len(vectors), batch_size):
+        recs.extend(scorer.query_batch(vectors[start:start + batch_size], k))
+    elapsed = time.perf_counter() - started_at
+
+    return len(vectors) / elapsed, recs
+
+
+def _recall(recs: tp.List[np.ndarray], truth: tp.List[np.ndarray]) -> float:
+    hits = [len(np.intersect1d(r, t)) / len(t) for r, t in zip(recs, truth)]
+    return float(np.mean(hits))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=PATH_CONFIG_MF)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    with open(args.config) as models_config:
+        params = yaml.safe_load(models_config)
+
+    user_embeddings = np.load(params["user_embeddings"], mmap_mode="r")
+    item_embeddings = np.load(params["item_embeddings"], mmap_mode="r")
+    rng = np.random.default_rng(0)
+    users_idx = rng.choice(
+        len(user_embeddings),
+        size=min(args.users, len(user_embeddings)),
+        replace=False,
+    )
+    vectors = np.asarray(user_embeddings[np.sort(users_idx)])
+
+    results = {}
+    for name, scorer_type in SCORERS.items():
+        started_at = time.perf_counter()
+        scorer = scorer_type(item_embeddings, params)
+        load_s = time.perf_counter() - started_at
+
+        latency = _latency(scorer, vectors[:200], args.k)
+        users_per_s, recs = _throughput(
+            scorer, vectors, args.k, args.batch_size
+        )
+        results[name] = {
+            "load_s": load_s, **latency, "users_per_s": users_per_s
+        }, recs
+
+    truth = results["exact"][1]
+    print(f"items: {len(item_embeddings)}, users: {len(vectors)}, k: {args.k}")
+    print(
+        f"{'scorer':<8}{'load_s':>10}{'p50_ms':>10}{'p99_ms':>10}"
+        f"{'users/s':>12}{'recall@k':>10}"
+    )
+    for name, (stats, recs) in results.items():
+        print(
+            f"{name:<8}{stats['load_s']:>10.2f}{stats['p50_ms']:>10.3f}"
+            f"{stats['p99_ms']:>10.3f}{stats['users_per_s']:>12.0f}"
+            f"{_recall(recs, truth):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+    Per-request cost of middleware stack: plain ASGI middlewares
+    of the service against the former BaseHTTPMiddleware ones.
+    Requests are sent to the ASGI app directly, without a server.
+
+    Usage: python -m benchmarks.middlewares --requests 20000
+"""
+import argparse
+import asyncio
+import time
+import typing as tp
+
+import numpy as np
+from fastapi import FastAPI, Request
+from starlette.middleware.base import (
+    BaseHTTPMiddleware,
+    RequestResponseEndpoint,
+)
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+
+from service.api.middlewares import add_middlewares
+from service.log import access_logger
+from service.models import Error
+from service.response import server_error
+
+
+class BaseAccessMiddleware(BaseHTTPMiddleware):
+
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: RequestResponseEndpoint,
+    ) -> Response:
+        started_at = time.perf_counter()
+        response = await call_next(request)
+        access_logger.info(
+            msg="",
+            extra={
+                "request_time": round(time.perf_counter() - started_at, 4),
+                "status_code": response.status_code,
+                "requested_url": request.url,
+                "method": request.method,
+            },
+        )
+        return response
+
+
+class BaseExceptionHandlerMiddleware(BaseHTTPMiddleware):
+
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: RequestResponseEndpoint,
+    ) -> Response:
+        try:
+            return await call_next(request)
+        except Exception:  # pylint: disable=W0703
+            error = Error(
+                error_key="server_error",
+                error_message="Internal Server Error"
+            )
+            return server_error([error])
+
+
+def _make_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/reco/{model_name}/{user_id}")
+    async def reco(model_name: str, user_id: int) -> tp.Dict:
+        return {"user_id": user_id, "items": list(range(10))}
+
+    if stack == "asgi":
+        add_middlewares(app)
+    elif stack == "base":
+        app.add_middleware(BaseExceptionHandlerMiddleware)
+        app.add_middleware(BaseAccessMiddleware)
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=['*'],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+    return app
+
+
+async def _request(app: FastAPI) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/reco/model/123",
+        "raw_path": b"/reco/model/123",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 8080),
+    }
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive() -> tp.Dict:
+        if messages:
+            return messages.pop()
+        return {"type": "http.disconnect"}
+
+    async def send(message: tp.Dict) -> None:
+        pass
+
+    await app(scope, receive, send)
+
+
+async def _measure(app: FastAPI, n_requests: int) -> tp.List[float]:
+    for _ in range(100):
+        await _request(app)
+
+    timings = []
+    for _ in range(n_requests):
+        started_at = time.perf_counter()
+        await _request(app)
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    for stack in ("none", "base", "asgi"):
+        timings = asyncio.run(_measure(_make_app(stack), args.requests))
+        print(
+            f"{stack:>5}: "
+            f"p50 {1e6 * np.percentile(timings, 50):.1f} us, "
+            f"p99 {1e6 * np.percentile(timings, 99):.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from multiprocessing import cpu_count
 from os import getenv as env
 
 from service import log, settings
+from service.utils.shared_reco_cache import SharedRecoCache
 
 # The socket to bind.
 host = env("HOST", "0.0.0.0")
@@ -103,3 +104,10 @@ tmp_upload_dir = env("GUNICORN_TMP_UPLOAD_DIR", None)
 
 # Front-end’s IPs from which allowed to handle set secure headers.
 forwarded_allow_ips = env("GUNICORN_FORWARDER_ALLOW_IPS", "127.0.0.1")
+
+
+def on_exit(server):
+    """Removes recommendation cache shared by workers."""
+    config = settings.get_config()
+    if config.reco_cache_tier == "shared":
+        SharedRecoCache.unlink(config.reco_cache_shared_name)
@@ -7,19 +7,30 @@ from fastapi import FastAPI
 
 from ..log import app_logger, setup_logging
 from ..settings import ServiceConfig
+from ..utils.model_watcher import ModelWatcher, ReloadMarker
+from ..utils.reco_cache import RecoCache
+from ..utils.run_reco_pipeline import pipeline
+from ..utils.shared_reco_cache import SharedRecoCache
+from .batcher import MicroBatcher
 from .exception_handlers import add_exception_handlers
+from .executor import InferenceExecutor
 from .middlewares import add_middlewares
 from .views import add_views
 
 __all__ = ("create_app",)
 
 
-def setup_asyncio(thread_name_prefix: str) -> None:
+def setup_asyncio(
+    thread_name_prefix: str,
+    max_workers: int,
+) -> ThreadPoolExecutor:
     uvloop.install()
 
     loop = asyncio.get_event_loop()
 
-    executor = ThreadPoolExecutor(thread_name_prefix=thread_name_prefix)
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix=thread_name_prefix
+    )
     loop.set_default_executor(executor)
 
     def handler(_, context: Dict[str, Any]) -> None:
@@ -28,16 +39,78 @@ def setup_asyncio(thread_name_prefix: str) -> None:
 
     loop.set_exception_handler(handler)
 
+    return executor
+
+
+def create_reco_cache(config: ServiceConfig):
+    if config.reco_cache_tier == "shared":
+        return SharedRecoCache(
+            name=config.reco_cache_shared_name,
+            n_slots=config.reco_cache_shared_slots,
+            max_k=config.k_recs,
+            ttl_s=config.reco_cache_ttl_s,
+        )
+
+    return RecoCache(
+        max_entries=config.reco_cache_max_entries,
+        ttl_s=config.reco_cache_ttl_s,
+        max_bytes=config.reco_cache_max_bytes,
+    )
+
 
 def create_app(config: ServiceConfig) -> FastAPI:
     setup_logging(config)
-    setup_asyncio(thread_name_prefix=config.service_name)
+    executor = setup_asyncio(
+        thread_name_prefix=config.service_name,
+        max_workers=config.inference_workers,
+    )
 
     app = FastAPI(debug=False)
     app.state.k_recs = config.k_recs
+    app.state.max_batch_users = config.max_batch_users
+    app.state.inference = InferenceExecutor(
+        executor,
+        max_workers=config.inference_workers,
+        max_queue=config.inference_queue_size,
+    )
+    app.state.batcher = MicroBatcher(
+        app.state.inference,
+        pipeline.recommend_batch,
+        max_users=config.reco_batch_max_users,
+        max_wait_ms=config.reco_batch_max_wait_ms,
+    )
+    app.add_event_handler("shutdown", app.state.batcher.close)
+    app.state.reco_cache = create_reco_cache(config)
+    pipeline.add_reload_listener(app.state.reco_cache.invalidate)
+    app.state.reload_executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix=f"{config.service_name}_reload"
+    )
+
+    app.state.reload_marker = None
+    if config.reload_marker_path:
+        app.state.reload_marker = ReloadMarker(config.reload_marker_path)
+
+    watch_artifacts = config.model_watch_interval_s > 0
+    if watch_artifacts or app.state.reload_marker is not None:
+        watcher = ModelWatcher(
+            pipeline,
+            interval_s=(
+                config.model_watch_interval_s if watch_artifacts
+                else config.reload_marker_interval_s
+            ),
+            marker=app.state.reload_marker,
+            watch_artifacts=watch_artifacts,
+        )
+        app.add_event_handler("startup", watcher.start)
+        app.add_event_handler("shutdown", watcher.stop)
 
     add_views(app)
-    add_middlewares(app)
+    add_middlewares(
+        app,
+        cors_allow_origins=config.cors_allow_origins,
+        access_sample_rate=config.log_config.access_sample_rate,
+        access_sample_rates=config.log_config.access_sample_rates,
+    )
     add_exception_handlers(app)
 
     return app
@@ -0,0 +1,106 @@
+import asyncio
+import typing as tp
+
+from .executor import InferenceExecutor
+
+__all__ = ("MicroBatcher",)
+
+BatchKey = tp.Tuple[str, int]
+
+
+class MicroBatcher:
+    """
+        Collects single-user requests of one model for `max_wait_ms`
+        or until `max_users` users and runs one `recommend_batch` call,
+        results are returned to every waiting request.
+    """
+
+    def __init__(
+        self,
+        inference: InferenceExecutor,
+        recommend_batch: tp.Callable[..., tp.List[tp.List[int]]],
+        max_users: int,
+        max_wait_ms: float,
+    ):
+        self.inference = inference
+        self.recommend_batch = recommend_batch
+        self.max_users = max_users
+        self.max_wait = max_wait_ms / 1000
+        self.pending: tp.Dict[
+            BatchKey, tp.List[tp.Tuple[int, asyncio.Future]]
+        ] = {}
+        self.timers: tp.Dict[BatchKey, asyncio.TimerHandle] = {}
+        # loop keeps only weak references to tasks
+        self._tasks: tp.Set[asyncio.Future] = set()
+
+    async def recommend(
+        self,
+        model_name: str,
+        user_id: int,
+        k_recs: int,
+    ) -> tp.List[int]:
+        if self.max_users <= 1:
+            recs = await self.inference.run(
+                self.recommend_batch,
+                model_name=model_name,
+                user_ids=[user_id],
+                k_recs=k_recs,
+            )
+            return recs[0]
+
+        loop = asyncio.get_running_loop()
+        key = (model_name, k_recs)
+        future = loop.create_future()
+        requests = self.pending.setdefault(key, [])
+        requests.append((user_id, future))
+
+        if len(requests) >= self.max_users:
+            self._flush(key)
+        elif len(requests) == 1:
+            self.timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: BatchKey) -> None:
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        requests = self.pending.pop(key, [])
+        if requests:
+            task = asyncio.ensure_future(self._run(key, requests))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """
+            Runs waiting requests and waits for running batches,
+            e.g. on server shutdown.
+        """
+        for key in list(self.pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(
+        self,
+        key: BatchKey,
+        requests: tp.List[tp.Tuple[int, asyncio.Future]],
+    ) -> None:
+        model_name, k_recs = key
+        try:
+            batch_recs = await self.inference.run(
+                self.recommend_batch,
+                model_name=model_name,
+                user_ids=[user_id for user_id, _ in requests],
+                k_recs=k_recs,
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), recs in zip(requests, batch_recs):
+            if not future.done():
+                future.set_result(recs)
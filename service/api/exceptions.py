@@ -48,3 +48,25 @@ class AuthenticateError(AppException):
         error_loc: tp.Optional[tp.Sequence[str]] = None,
     ):
         super().__init__(status_code, error_key, error_message, error_loc)
+
+
+class BatchTooLargeError(AppException):
+    def __init__(
+        self,
+        status_code: int = HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        error_key: str = "batch_too_large",
+        error_message: str = "Too many users in batch",
+        error_loc: tp.Optional[tp.Sequence[str]] = None,
+    ):
+        super().__init__(status_code, error_key, error_message, error_loc)
+
+
+class ServiceOverloadedError(AppException):
+    def __init__(
+        self,
+        status_code: int = HTTPStatus.SERVICE_UNAVAILABLE,
+        error_key: str = "service_overloaded",
+        error_message: str = "Too many requests in progress, retry later",
+        error_loc: tp.Optional[tp.Sequence[str]] = None,
+    ):
+        super().__init__(status_code, error_key, error_message, error_loc)
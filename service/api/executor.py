@@ -0,0 +1,42 @@
+import asyncio
+import typing as tp
+from concurrent.futures import Executor, Future
+from functools import partial
+
+from .exceptions import ServiceOverloadedError
+
+__all__ = ("InferenceExecutor",)
+
+
+class InferenceExecutor:
+    """
+        Runs blocking inference in executor, out of the event loop.
+        At most `max_workers` calls run and `max_queue` calls wait,
+        the next calls are rejected with 503 at once.
+    """
+
+    def __init__(self, executor: Executor, max_workers: int, max_queue: int):
+        self.executor = executor
+        self.max_pending = max_workers + max_queue
+        self.pending = 0
+
+    def _release(self) -> None:
+        self.pending -= 1
+
+    async def run(self, func: tp.Callable, *args, **kwargs) -> tp.Any:
+        # counter is used only from the event loop thread, no lock needed
+        if self.pending >= self.max_pending:
+            raise ServiceOverloadedError()
+
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(partial(func, *args, **kwargs))
+        self.pending += 1
+
+        def release(_: Future) -> None:
+            # call is released when it is done in executor, not when
+            # the request waiting for it is cancelled
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._release)
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future, loop=loop)
@@ -1,71 +1,135 @@
+import logging
+import random
 import time
+import typing as tp
 
-from fastapi import FastAPI, Request
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-    RequestResponseEndpoint,
-)
+from fastapi import FastAPI
+from starlette.datastructures import URL
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from service.log import access_logger, app_logger
 from service.models import Error
 from service.response import server_error
 
 
-class AccessMiddleware(BaseHTTPMiddleware):
+class AccessMiddleware:
+    """
+        Logs time and status of http requests. Plain ASGI
+        middleware: request goes to the app without extra task
+        and response is not re-streamed.
+        Requests are sampled by rate of their route path,
+        server errors are always logged.
+    """
 
-    async def dispatch(
+    def __init__(
         self,
-        request: Request,
-        call_next: RequestResponseEndpoint,
-    ) -> Response:
-        started_at = time.perf_counter()
-        response = await call_next(request)
-        request_time = time.perf_counter() - started_at
-
-        status_code = response.status_code
-
-        access_logger.info(
-            msg="",
-            extra={
-                "request_time": round(request_time, 4),
-                "status_code": status_code,
-                "requested_url": request.url,
-                "method": request.method,
-            },
+        app: ASGIApp,
+        sample_rate: float = 1.0,
+        sample_rates: tp.Optional[tp.Dict[str, float]] = None,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.sample_rates = sample_rates or {}
+
+    def _is_sampled(self, scope: Scope, status_code: int) -> bool:
+        if status_code >= 500:
+            return True
+
+        route = scope.get("route")
+        rate = self.sample_rates.get(
+            getattr(route, "path", None), self.sample_rate
         )
-        return response
+        return rate >= 1 or random.random() < rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        started_at = time.perf_counter()
+        status_code = 500
 
-class ExceptionHandlerMiddleware(BaseHTTPMiddleware):
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_time = time.perf_counter() - started_at
+            if access_logger.isEnabledFor(logging.INFO) and self._is_sampled(
+                scope, status_code
+            ):
+                access_logger.info(
+                    msg="",
+                    extra={
+                        "request_time": round(request_time, 4),
+                        "status_code": status_code,
+                        "requested_url": URL(scope=scope),
+                        "method": scope["method"],
+                    },
+                )
+
+
+class ExceptionHandlerMiddleware:
+    """
+        Turns unhandled exceptions into server error response
+        if the response has not been started yet.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: RequestResponseEndpoint,
-    ) -> Response:
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:  # pylint: disable=W0703,W1203
             app_logger.exception(
                 msg=f"Caught unhandled {e.__class__} exception: {e}"
             )
+            if response_started:
+                raise
+
             error = Error(
                 error_key="server_error",
                 error_message="Internal Server Error"
             )
-            return server_error([error])
+            await server_error([error])(scope, receive, send)
 
 
-def add_middlewares(app: FastAPI) -> None:
+def add_middlewares(
+    app: FastAPI,
+    cors_allow_origins: tp.Sequence[str] = ("*",),
+    access_sample_rate: float = 1.0,
+    access_sample_rates: tp.Optional[tp.Dict[str, float]] = None,
+) -> None:
     # do not change order
     app.add_middleware(ExceptionHandlerMiddleware)
-    app.add_middleware(AccessMiddleware)
     app.add_middleware(
-        CORSMiddleware,
-        allow_origins=['*'],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+        AccessMiddleware,
+        sample_rate=access_sample_rate,
+        sample_rates=access_sample_rates,
     )
+    if cors_allow_origins:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=list(cors_allow_origins),
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
@@ -1,17 +1,24 @@
-from typing import List
+import asyncio
+from typing import List, Optional
 
 import yaml
-from fastapi import APIRouter, Depends, FastAPI, Request, Security
+from fastapi import APIRouter, Depends, FastAPI, Query, Request, Security
+from fastapi.responses import Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
 from service.api.exceptions import (
     AuthenticateError,
+    BatchTooLargeError,
     ModelNotFoundError,
     UserNotFoundError,
 )
-from service.config.responses_cfg import example_responses
+from service.config.responses_cfg import (
+    example_batch_responses,
+    example_responses,
+)
 from service.log import app_logger
+from service.response import batch_reco_response, reco_response
 from service.utils.common_artifact import registered_model
 from service.utils.run_reco_pipeline import pipeline
 from service.utils.popular.run_reco_popular import add_reco_popular
@@ -19,12 +26,37 @@ from service.utils.popular.run_reco_popular import add_reco_popular
 with open('./service/envs/authentication_env.yaml') as env_config:
     ENV_TOKEN = yaml.safe_load(env_config)
 
+# ids are looked up in int64 arrays
+MIN_ID = -2 ** 63
+MAX_ID = 2 ** 63 - 1
+MAX_USER_ID = 10 ** 9
+
 
 class RecoResponse(BaseModel):
     user_id: int
     items: List[int]
 
 
+class BatchRecoRequest(BaseModel):
+    user_ids: List[int]
+
+
+class BatchRecoResponse(BaseModel):
+    recos: List[RecoResponse]
+
+
+class ReloadResponse(BaseModel):
+    reloaded: List[str]
+
+
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    bytes: int
+
+
 router = APIRouter()
 auth_scheme = HTTPBearer(auto_error=False)
 
@@ -58,25 +90,153 @@ async def get_reco(
     request: Request,
     model_name: str,
     user_id: int,
+    history: Optional[List[int]] = Query(
+        None,
+        description="Recently watched items, used for new users",
+    ),
     token: HTTPAuthorizationCredentials = Depends(authorization_by_token),
-) -> RecoResponse:
-    app_logger.info(f"Request for model: {model_name}, user_id: {user_id}")
+) -> Response:
+    app_logger.info(
+        "Request for model: %s, user_id: %s", model_name, user_id
+    )
 
     if model_name not in registered_model:
         raise ModelNotFoundError(
             error_message=f"Model name '{model_name}' not found"
         )
 
-    if user_id > 10 ** 9:
+    if not MIN_ID <= user_id <= MAX_USER_ID:
         raise UserNotFoundError(error_message=f"User {user_id} not found")
 
     k_recs = request.app.state.k_recs
 
-    recs = pipeline.recommend(user_id=user_id, k_recs=k_recs)
+    if history:
+        # items out of int64 are unknown to every model
+        history = [item for item in history if MIN_ID <= item <= MAX_ID]
+    if history and pipeline.uses_history(model_name, user_id):
+        # recommendations of new users depend on history, not cached
+        recs = await request.app.state.inference.run(
+            pipeline.recommend,
+            model_name=model_name,
+            user_id=user_id,
+            k_recs=k_recs,
+            history=history,
+        )
+        return reco_response(
+            user_id,
+            add_reco_popular(k_recs=k_recs, curr_recs=recs, user_id=user_id),
+        )
+
+    # aliases share entries of the model serving them,
+    # so reload of the model invalidates them too
+    reco_cache = request.app.state.reco_cache
+    cache_key = (pipeline.resolve_name(model_name), user_id, k_recs)
+    recs = reco_cache.get(cache_key)
+    if recs is None:
+        recs = await request.app.state.batcher.recommend(
+            model_name=model_name, user_id=user_id, k_recs=k_recs
+        )
+        recs = add_reco_popular(
+            k_recs=k_recs, curr_recs=recs, user_id=user_id
+        )
+        reco_cache.put(cache_key, recs)
+
+    return reco_response(user_id, recs)
+
+
+@router.post(
+    path="/reco/{model_name}/batch",
+    tags=["Recommendations"],
+    response_model=BatchRecoResponse,
+    responses=example_batch_responses,
+)
+async def get_reco_batch(
+    request: Request,
+    model_name: str,
+    body: BatchRecoRequest,
+    token: HTTPAuthorizationCredentials = Depends(authorization_by_token),
+) -> Response:
+    user_ids = body.user_ids
+    app_logger.info(
+        "Batch request for model: %s, users: %s", model_name, len(user_ids)
+    )
+
+    if model_name not in registered_model:
+        raise ModelNotFoundError(
+            error_message=f"Model name '{model_name}' not found"
+        )
+
+    max_batch_users = request.app.state.max_batch_users
+    if len(user_ids) > max_batch_users:
+        raise BatchTooLargeError(
+            error_message=(
+                f"Batch size {len(user_ids)} exceeds {max_batch_users}"
+            )
+        )
+
+    for user_id in user_ids:
+        if not MIN_ID <= user_id <= MAX_USER_ID:
+            raise UserNotFoundError(error_message=f"User {user_id} not found")
+
+    k_recs = request.app.state.k_recs
+
+    batch_recs = await request.app.state.inference.run(
+        pipeline.recommend_batch,
+        model_name=model_name,
+        user_ids=user_ids,
+        k_recs=k_recs,
+    )
+
+    return batch_reco_response(
+        user_ids,
+        [
+            add_reco_popular(k_recs=k_recs, curr_recs=recs, user_id=user_id)
+            for user_id, recs in zip(user_ids, batch_recs)
+        ],
+    )
+
+
+@router.get(
+    path="/cache/stats",
+    tags=["Health"],
+    response_model=CacheStatsResponse,
+)
+async def cache_stats(
+    request: Request,
+    token: HTTPAuthorizationCredentials = Depends(authorization_by_token),
+) -> CacheStatsResponse:
+    return CacheStatsResponse(**request.app.state.reco_cache.stats())
+
+
+@router.post(
+    path="/admin/reload",
+    tags=["Admin"],
+    response_model=ReloadResponse,
+)
+async def reload_models(
+    request: Request,
+    model_name: Optional[str] = None,
+    token: HTTPAuthorizationCredentials = Depends(authorization_by_token),
+) -> ReloadResponse:
+    """
+    Reloads artifacts of the model (of all loaded models if not set)
+    in this worker, requests are served by old version meanwhile.
+    Other workers of the host reload it on next check of reload marker.
+    """
+    if model_name is not None and model_name not in pipeline.models_config:
+        raise ModelNotFoundError(
+            error_message=f"Model name '{model_name}' not found"
+        )
 
-    recs = add_reco_popular(k_recs=k_recs, curr_recs=recs)
+    app_logger.info(f"Reload request for model: {model_name}")
+    loop = asyncio.get_running_loop()
+    reloaded = await loop.run_in_executor(
+        request.app.state.reload_executor, pipeline.reload, model_name
+    )
+    if request.app.state.reload_marker is not None:
+        request.app.state.reload_marker.notify(model_name)
 
-    return RecoResponse(user_id=user_id, items=recs)
+    return ReloadResponse(reloaded=reloaded)
 
 
 def add_views(app: FastAPI) -> None:
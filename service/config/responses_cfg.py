@@ -1,3 +1,23 @@
+example_overloaded_response = {
+    "description": "Service Unavailable",
+    "content": {
+        "application/json": {
+            "examples": {
+                "Service overloaded": {
+                    "summary": "Inference queue is full",
+                    "value": {
+                        "error_key": "service_overloaded",
+                        "error_message": (
+                            "Too many requests in progress, retry later"
+                        ),
+                        "error_loc": None
+                    }
+                },
+            }
+        }
+    }
+}
+
 example_responses = {
     200: {
         "description": "Success",
@@ -40,4 +60,51 @@ example_responses = {
             }
         }
     },
+    503: example_overloaded_response,
+}
+
+example_batch_responses = {
+    200: {
+        "description": "Success",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "Default batch reco": {
+                        "summary": "Success batch recommendation",
+                        "value": {
+                            "recos": [
+                                {
+                                    "user_id": 777,
+                                    "items": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+                                },
+                                {
+                                    "user_id": 778,
+                                    "items": [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]
+                                },
+                            ]
+                        }
+                    },
+                }
+            }
+        }
+    },
+    404: example_responses[404],
+    413: {
+        "description": "Payload Too Large",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "Batch too large": {
+                        "summary": "Too many users in batch",
+                        "value": {
+                            "error_key": "batch_too_large",
+                            "error_message": "Batch size 20000 exceeds 10000",
+                            "error_loc": None
+                        }
+                    },
+                }
+            }
+        }
+    },
+    503: example_overloaded_response,
 }
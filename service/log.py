@@ -1,11 +1,25 @@
+import atexit
 import logging.config
+import os
+import queue
 import typing as tp
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
 
 from .settings import ServiceConfig
 
 app_logger = logging.getLogger("app")
 access_logger = logging.getLogger("access")
 
+# attributes of every record, the rest are `extra` fields
+RECORD_FIELDS = frozenset(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "service_name",
+}
+
+# queue handler of loggers and listener writing records of its queue
+_listeners: tp.List[tp.Tuple[QueueHandler, QueueListener]] = []
+
 
 class ServiceNameFilter(logging.Filter):
 
@@ -20,6 +34,87 @@ class ServiceNameFilter(logging.Filter):
         return super().filter(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """
+        Record as one line of json with `extra` fields of the record.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "service_name": getattr(record, "service_name", ""),
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+
+        return orjson.dumps(entry, default=str).decode()
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+        Puts record to queue of the same process as is,
+        message is formatted by the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _use_queue(loggers: tp.Iterable[logging.Logger]) -> None:
+    """
+        Handlers of loggers write in background threads:
+        every handler gets a queue and a listener,
+        loggers put records to queues of their handlers.
+    """
+    queue_handlers: tp.Dict[logging.Handler, QueueHandler] = {}
+    for logger in loggers:
+        for handler in logger.handlers:
+            if handler not in queue_handlers:
+                records: queue.SimpleQueue = queue.SimpleQueue()
+                queue_handler = LocalQueueHandler(records)
+                listener = QueueListener(
+                    records, handler, respect_handler_level=True
+                )
+                listener.start()
+                _listeners.append((queue_handler, listener))
+                queue_handlers[handler] = queue_handler
+
+        logger.handlers = [
+            queue_handlers[handler] for handler in logger.handlers
+        ]
+
+
+def stop_logging() -> None:
+    """
+        Writes records left in queues and stops listeners.
+    """
+    while _listeners:
+        _listeners.pop()[1].stop()
+
+
+def _restart_listeners() -> None:
+    """
+        Listener threads are not copied to a forked process
+        (e.g. gunicorn workers of preloaded app): the child gets
+        new queues, records of the parent are left to the parent.
+    """
+    for position, (queue_handler, listener) in enumerate(_listeners):
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler.queue = records
+        listener = QueueListener(
+            records, *listener.handlers, respect_handler_level=True
+        )
+        listener.start()
+        _listeners[position] = (queue_handler, listener)
+
+
 def get_config(service_config: ServiceConfig) -> tp.Dict[str, tp.Any]:
     level = service_config.log_config.level
     datetime_format = service_config.log_config.datetime_format
@@ -137,9 +232,23 @@ def get_config(service_config: ServiceConfig) -> tp.Dict[str, tp.Any]:
         },
     }
 
+    if service_config.log_config.json_format:
+        for name in ("console", "access"):
+            config["formatters"][name] = {
+                "()": "service.log.JsonFormatter",
+                "datefmt": datetime_format,
+            }
+
     return config
 
 
 def setup_logging(service_config: ServiceConfig) -> None:
+    stop_logging()
     config = get_config(service_config)
     logging.config.dictConfig(config)
+    if service_config.log_config.queue:
+        _use_queue(logging.getLogger(name) for name in config["loggers"])
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_listeners)
@@ -1,37 +1,63 @@
-import json
 import typing as tp
 from http import HTTPStatus
 
 import orjson
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
 from service.models import Error
 
 
-class EnhancedJSONEncoder(json.JSONEncoder):
-    def default(self, o: tp.Any) -> tp.Any:
-        if isinstance(o, BaseModel):
-            return o.dict()
-        try:
-            orjson.dumps(o)
-        except TypeError:
-            return str(o)
-        return super().default(o)
+def _default(o: tp.Any) -> tp.Any:
+    """
+        Types orjson does not know: pydantic models as dicts,
+        anything else as string.
+    """
+    if isinstance(o, BaseModel):
+        return o.dict()
+    return str(o)
+
+
+def dumps(content: tp.Any) -> bytes:
+    return orjson.dumps(
+        content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY
+    )
 
 
 class DataclassJSONResponse(JSONResponse):
     media_type = "application/json"
 
     def render(self, content: tp.Any) -> bytes:
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-            allow_nan=False,
-            indent=None,
-            separators=(",", ":"),
-            cls=EnhancedJSONEncoder,
-        ).encode("utf-8")
+        return dumps(content)
+
+
+def reco_response(user_id: int, items: tp.List[int]) -> Response:
+    """
+        Body of RecoResponse without model validation,
+        items are already a list of ints.
+    """
+    return Response(
+        orjson.dumps({"user_id": user_id, "items": items}),
+        media_type="application/json",
+    )
+
+
+def batch_reco_response(
+    user_ids: tp.List[int],
+    batch_items: tp.List[tp.List[int]],
+) -> Response:
+    """
+        Body of BatchRecoResponse, as `reco_response`.
+    """
+    return Response(
+        orjson.dumps({
+            "recos": [
+                {"user_id": user_id, "items": items}
+                for user_id, items in zip(user_ids, batch_items)
+            ]
+        }),
+        media_type="application/json",
+    )
 
 
 def create_response(
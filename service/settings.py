@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic import BaseSettings
 
 
@@ -10,6 +12,11 @@ class Config(BaseSettings):
 class LogConfig(Config):
     level: str = "INFO"
     datetime_format: str = "%Y-%m-%d %H:%M:%S"
+    queue: bool = True  # records are written by background thread
+    json_format: bool = False  # one json object per record
+    access_sample_rate: float = 1.0  # share of logged requests
+    # route path -> share, e.g. {"/reco/{model_name}/{user_id}": 0.01}
+    access_sample_rates: Dict[str, float] = {}
 
     class Config:
         case_sensitive = False
@@ -17,12 +24,41 @@ class LogConfig(Config):
             "level": {
                 "env": ["log_level"]
             },
+            "queue": {
+                "env": ["log_queue"]
+            },
+            "json_format": {
+                "env": ["log_json"]
+            },
+            "access_sample_rate": {
+                "env": ["log_access_sample_rate"]
+            },
+            "access_sample_rates": {
+                "env": ["log_access_sample_rates"]
+            },
         }
 
 
 class ServiceConfig(Config):
     service_name: str = "reco_service"
     k_recs: int = 10
+    max_batch_users: int = 10000
+    inference_workers: int = 4
+    inference_queue_size: int = 64
+    reco_batch_max_users: int = 64
+    reco_batch_max_wait_ms: float = 2.0
+    reco_cache_max_entries: int = 100000
+    reco_cache_ttl_s: float = 60.0
+    reco_cache_max_bytes: int = 64 * 1024 * 1024
+    reco_cache_tier: str = "local"  # local / shared
+    reco_cache_shared_name: str = "reco_cache"
+    reco_cache_shared_slots: int = 2 ** 18
+    model_watch_interval_s: float = 0.0  # 0 - artifacts are not watched
+    # reload requests passed to other workers of the host,
+    # empty - /admin/reload reloads only the worker serving it
+    reload_marker_path: str = "/tmp/reco_service.reload"
+    reload_marker_interval_s: float = 1.0
+    cors_allow_origins: List[str] = ["*"]  # empty - no CORS middleware
 
     log_config: LogConfig
 
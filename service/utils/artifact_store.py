@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import typing as tp
+
+import numpy as np
+
+META_FILE = "meta.json"
+
+
+def as_ids(values: np.ndarray) -> np.ndarray:
+    """
+        Ids as int32 when they fit, int64 otherwise.
+    """
+    values = np.asarray(values)
+    info = np.iinfo(np.int32)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        return values.astype(np.int64)
+    return values.astype(np.int32)
+
+
+def save_array_dir(
+    path: str,
+    arrays: tp.Dict[str, np.ndarray],
+    replace: bool = False,
+    meta: tp.Optional[tp.Dict] = None,
+) -> None:
+    """
+        Writes arrays to directory of .npy files (and `meta` to json).
+        Directory is renamed into place, so concurrent writers
+        do not clash. Existing directory is kept unless `replace` is set.
+    """
+    path_tmp = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(path_tmp, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path_tmp, f"{name}.npy"), array)
+    if meta is not None:
+        with open(os.path.join(path_tmp, META_FILE), "w") as file:
+            json.dump(meta, file)
+
+    path_old = f"{path}.old-{os.getpid()}"
+    if replace and os.path.isdir(path):
+        os.rename(path, path_old)
+
+    try:
+        os.rename(path_tmp, path)
+    except OSError:
+        shutil.rmtree(path_tmp, ignore_errors=True)
+
+    shutil.rmtree(path_old, ignore_errors=True)
+
+
+def load_meta(path: str) -> tp.Dict:
+    with open(os.path.join(path, META_FILE)) as file:
+        return json.load(file)
+
+
+def load_array_dir(
+    path: str,
+    names: tp.Iterable[str],
+    mmap_mode: tp.Optional[str] = "r",
+) -> tp.List[np.ndarray]:
+    return [
+        np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in names
+    ]
+
+
+class ArtifactStore:
+    """
+        Directory of compiled artifacts stored as flat .npy arrays.
+        Arrays are opened with np.load(mmap_mode='r'), so all gunicorn
+        workers of a host share the same physical pages.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def array_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.npy")
+
+    def exists(self, *names: str, sources: tp.Sequence[str] = ()) -> bool:
+        """
+            Arrays are compiled and are not older than their source files.
+        """
+        paths = [self.array_path(name) for name in names]
+        if not all(os.path.isfile(path) for path in paths):
+            return False
+
+        compiled_at = min(os.path.getmtime(path) for path in paths)
+        return all(
+            os.path.getmtime(source) <= compiled_at
+            for source in sources
+            if os.path.exists(source)
+        )
+
+    def save(self, name: str, array: np.ndarray) -> None:
+        """
+            Writes array next to its final place and renames it,
+            so running workers never map a half-written file.
+        """
+        path = self.array_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        path_tmp = f"{path}.tmp-{os.getpid()}.npy"
+        np.save(path_tmp, np.ascontiguousarray(array))
+        os.replace(path_tmp, path)
+
+    def load(
+        self,
+        name: str,
+        mmap_mode: tp.Optional[str] = "r",
+    ) -> np.ndarray:
+        return np.load(self.array_path(name), mmap_mode=mmap_mode)
@@ -0,0 +1,137 @@
+"""
+    Generates offline recommendations of a configured model for all users
+    with a pool of processes and saves them as offline reco index.
+
+    Usage: python -m service.utils.batch_inference \
+        --model userKNN_tfidf_implicit_numpy_online \
+        --output ./data/hw_3/userKNN_tfidf_10.index --workers 8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import typing as tp
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from service.log import app_logger
+from service.utils.common_artifact import registered_model, users
+from service.utils.model_types import MODEL_TYPES
+from service.utils.offline_index import OfflineRecoIndex
+
+PATH_CONFIG_PIPELINE = "./service/config/main-pipeline.cfg.yml"
+
+# model of the process, loaded before the pool is forked,
+# so workers share its memory-mapped and read-only memory
+_model = None
+
+
+def load_model(model_name: str, path_pipeline: str = PATH_CONFIG_PIPELINE):
+    """
+        Model as served by MainPipeline: registered names without
+        own entry are served by default model.
+    """
+    with open(path_pipeline) as models_config:
+        pipeline = yaml.safe_load(models_config)
+
+    models = pipeline["models"]
+    if model_name not in models:
+        if model_name not in registered_model:
+            raise ValueError(f"Model name '{model_name}' not found")
+        model_name = pipeline["default_model"]
+
+    model_config = models[model_name]
+    model_type = MODEL_TYPES[model_config["type_model"]]
+    return model_type(model_config["config"])
+
+
+def _recommend_shard(task: tp.Tuple[str, np.ndarray, int]) -> str:
+    path_shard, user_ids, k_recs = task
+    recs = _model.recommend_batch(user_ids.tolist(), k_recs)
+    OfflineRecoIndex.from_lists(user_ids, recs).save(path_shard, replace=True)
+    return path_shard
+
+
+def run_batch_inference(
+    model,
+    user_ids: np.ndarray,
+    path_output: str,
+    k_recs: int = 10,
+    workers: tp.Optional[int] = None,
+    shard_size: int = 10000,
+) -> OfflineRecoIndex:
+    """
+        Splits users into shards, every shard is written by a worker
+        to its own index, shards are merged into `path_output`.
+        All cores are used if `workers` is None.
+    """
+    global _model  # pylint: disable=global-statement
+    _model = model
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    user_ids = pd.unique(np.asarray(user_ids, dtype=np.int64))
+    path_shards = f"{path_output}.shards"
+    os.makedirs(path_shards, exist_ok=True)
+    tasks = [
+        (
+            os.path.join(path_shards, f"part-{number:05d}"),
+            user_ids[start:start + shard_size],
+            k_recs,
+        )
+        for number, start in enumerate(range(0, len(user_ids), shard_size))
+    ]
+
+    if workers > 1 and len(tasks) > 1:
+        with mp.get_context("fork").Pool(workers) as pool:
+            for path_shard in pool.imap_unordered(_recommend_shard, tasks):
+                app_logger.info(f"Shard is written: {path_shard}")
+    else:
+        for task in tasks:
+            _recommend_shard(task)
+
+    index = OfflineRecoIndex.merge([
+        OfflineRecoIndex.load(path_shard, mmap_mode=None)
+        for path_shard, _, _ in tasks
+    ])
+    index.save(path_output, replace=True)
+    shutil.rmtree(path_shards, ignore_errors=True)
+
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument(
+        "--users", help="csv with user_id column, all users by default"
+    )
+    parser.add_argument("--csv", help="also write offline reco csv")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--shard-size", type=int, default=10000)
+    parser.add_argument("--pipeline", default=PATH_CONFIG_PIPELINE)
+    args = parser.parse_args()
+
+    if args.users is None:
+        user_ids = np.asarray(users)
+    else:
+        user_ids = pd.read_csv(args.users)["user_id"].values
+
+    index = run_batch_inference(
+        load_model(args.model, args.pipeline),
+        user_ids,
+        args.output,
+        k_recs=args.k,
+        workers=args.workers,
+        shard_size=args.shard_size,
+    )
+    if args.csv is not None:
+        index.to_frame().to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
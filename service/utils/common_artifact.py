@@ -1,11 +1,38 @@
 import pandas as pd
 import yaml
 
+from service.utils.artifact_store import ArtifactStore
+from service.utils.csr import build_csr
+from service.utils.id_mapping import IdMapping
+
 PATH_CONFIG_FILE = "./service/config/common-data.cfg.yml"
 
 with open(PATH_CONFIG_FILE) as models_config:
     data = yaml.safe_load(models_config)
 
 registered_model = data["registered_model"]
-popular_items = pd.read_csv(data["popular_items"])["item_id"].tolist()
-interactions = pd.read_csv(data["interactions"])
+store = ArtifactStore(data["artifact_store"])
+
+if store.exists(
+    "popular_items", "users", "items", "seen_indptr", "seen_indices",
+    sources=[data["popular_items"], data["interactions"]],
+):
+    popular_items = store.load("popular_items").tolist()
+    users_mapping = IdMapping.load(store, "users")
+    items = store.load("items")
+    seen_indptr = store.load("seen_indptr")
+    seen_indices = store.load("seen_indices")
+else:
+    popular_items = pd.read_csv(data["popular_items"])["item_id"].tolist()
+    interactions = pd.read_csv(data["interactions"])
+    users_idx, users = pd.factorize(interactions["user_id"])
+    items_idx, items = pd.factorize(interactions["item_id"])
+    users, items = users.values, items.values
+    seen_indptr, seen_indices = build_csr(
+        users_idx, items_idx, len(users), sort_values=True
+    )
+    users_mapping = IdMapping(users)
+    del interactions, users_idx, items_idx
+
+users = users_mapping.external_ids
+items_mapping = IdMapping(items)
@@ -0,0 +1,205 @@
+"""
+    Converts raw csv artifacts into the memory-mapped artifact store.
+
+    Usage: python -m service.utils.compile_artifacts
+"""
+import typing as tp
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from service.utils.artifact_store import ArtifactStore, as_ids
+from service.utils.csr import build_csr, get_rows
+from service.utils.id_mapping import IdMapping
+from service.utils.matrix_factorization.ann_index import (
+    build_index,
+    get_checksum,
+    get_top_k_checksum,
+    save_index,
+    save_top_k,
+)
+from service.utils.matrix_factorization.scorers import get_scorer, query_top_k
+from service.utils.offline_index import OfflineRecoIndex
+from service.utils.popular.popular_fallback import build_segments
+from service.utils.user_knn.download_artifact_userKNN import (
+    ITEM_IDF_RANK_ARRAY,
+    DownloadArtifact,
+    build_item_idf_rank,
+    build_watched,
+)
+from service.utils.user_knn.neighbours import export_neighbours
+
+PATH_CONFIG_FILE = "./service/config/common-data.cfg.yml"
+PATH_CONFIG_MF = "./service/config/inference-MF.cfg.yml"
+PATH_CONFIG_PIPELINE = "./service/config/main-pipeline.cfg.yml"
+
+
+def compile_common_artifacts(data: dict, store: ArtifactStore) -> None:
+    """
+        Popular items (and of user segments if configured), user / item
+        ids of interactions and items seen by every user. Ids are kept
+        in order of first appearance (model index order), seen items
+        are CSR of item indices.
+    """
+    popular_items = pd.read_csv(data["popular_items"])["item_id"].values
+    store.save("popular_items", as_ids(popular_items))
+
+    interactions = pd.read_csv(
+        data["interactions"], usecols=["user_id", "item_id"]
+    )
+    users_idx, users = pd.factorize(interactions["user_id"])
+    items_idx, items = pd.factorize(interactions["item_id"])
+    IdMapping(as_ids(users.values)).save(store, "users")
+    store.save("items", as_ids(items.values))
+
+    seen_indptr, seen_indices = build_csr(
+        users_idx, items_idx, len(users), sort_values=True
+    )
+    store.save("seen_indptr", seen_indptr)
+    store.save("seen_indices", seen_indices)
+
+    segments_config = data.get("popular_segments")
+    if segments_config is not None:
+        segments = build_segments(
+            popular_items,
+            pd.read_csv(segments_config["users"]),
+            pd.read_csv(segments_config["items"]),
+        )
+        for name, array in segments.items():
+            store.save(name, array)
+
+
+def compile_user_knn_artifacts(store: ArtifactStore) -> None:
+    """
+        Items watched by every user and item idf rank used by userKNN.
+    """
+    arrays = build_watched(DownloadArtifact.path_interactions_data)
+    for name, array in arrays.items():
+        store.save(name, array)
+    IdMapping(arrays["user_knn_users"]).save(store, "user_knn_users")
+
+    store.save(
+        ITEM_IDF_RANK_ARRAY,
+        build_item_idf_rank(DownloadArtifact.path_item_idf),
+    )
+
+
+def _read_user_knn_params(path_pipeline: str) -> tp.List[tp.Dict]:
+    with open(path_pipeline) as models_config:
+        models = yaml.safe_load(models_config)["models"]
+
+    params = []
+    for model_config in models.values():
+        if model_config["type_model"] == "user_knn":
+            with open(model_config["config"]) as models_config:
+                params.append(yaml.safe_load(models_config)["run_params"])
+
+    return params
+
+
+def compile_offline_indexes(path_pipeline: str) -> None:
+    """
+        Offline recommendations of userKNN models as memory-mapped index.
+    """
+    paths = set()
+    for run_params in _read_user_knn_params(path_pipeline):
+        artifact = run_params["artifact"]
+        if run_params["type_reco"] == "offline" and artifact.get(
+            "offline_index_path"
+        ):
+            paths.add(
+                (artifact["offline_index_path"], artifact["offline_reco_path"])
+            )
+
+    for path_index, path_csv in sorted(paths):
+        OfflineRecoIndex.from_csv(path_csv).save(path_index, replace=True)
+
+
+def compile_user_knn_neighbours(path_pipeline: str) -> None:
+    """
+        Pruned neighbour lists of online userKNN models.
+    """
+    paths = set()
+    for run_params in _read_user_knn_params(path_pipeline):
+        artifact = run_params["artifact"]
+        if run_params["type_reco"] == "online":
+            paths.add(artifact["model_path_1"])
+            if artifact["blending"]:
+                paths.add(artifact["model_path_2"])
+
+    for path_model in sorted(paths):
+        export_neighbours(path_model)
+
+
+def compile_mf_index(params: dict) -> None:
+    """
+        Builds approximate search index and saves it with checksum
+        of embeddings, so workers load it instead of building.
+    """
+    approximate_search = params["approximate_search"]
+    item_embeddings = np.load(params["item_embeddings"], mmap_mode="r")
+
+    index = build_index(item_embeddings, approximate_search)
+    save_index(
+        index,
+        approximate_search["index_path"],
+        get_checksum(item_embeddings, approximate_search),
+    )
+
+
+def compile_mf_top_k(params: dict, store: ArtifactStore) -> None:
+    """
+        Precomputes top-k items of all known users with batched queries.
+    """
+    top_k_params = params["precomputed_top_k"]
+    user_embeddings = np.load(params["user_embeddings"], mmap_mode="r")
+    item_embeddings = np.load(params["item_embeddings"], mmap_mode="r")
+
+    exclude, seen = None, None
+    if params.get("filter_seen", False):
+        seen = (store.load("seen_indptr"), store.load("seen_indices"))
+        exclude = get_rows(*seen, range(len(user_embeddings)))
+
+    top_k = query_top_k(
+        get_scorer(item_embeddings, params),
+        user_embeddings,
+        k=top_k_params["k"],
+        batch_size=top_k_params.get("batch_size", 10000),
+        exclude=exclude,
+    )
+    save_top_k(
+        top_k,
+        top_k_params["path"],
+        get_top_k_checksum(
+            user_embeddings,
+            item_embeddings,
+            params["approximate_search"],
+            top_k_params["k"],
+            scorer=params.get("scorer", "nmslib"),
+            seen=seen,
+        ),
+    )
+
+
+def main() -> None:
+    with open(PATH_CONFIG_FILE) as models_config:
+        data = yaml.safe_load(models_config)
+
+    store = ArtifactStore(data["artifact_store"])
+    compile_common_artifacts(data, store)
+    compile_user_knn_artifacts(store)
+    compile_offline_indexes(PATH_CONFIG_PIPELINE)
+    compile_user_knn_neighbours(PATH_CONFIG_PIPELINE)
+
+    with open(PATH_CONFIG_MF) as models_config:
+        params = yaml.safe_load(models_config)
+
+    if params.get("scorer", "nmslib") == "nmslib":
+        compile_mf_index(params)
+    if params.get("precomputed_top_k", {}).get("enabled", False):
+        compile_mf_top_k(params, store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import typing as tp
+
+import numpy as np
+
+
+def build_csr(
+    rows: np.ndarray,
+    values: np.ndarray,
+    n_rows: int,
+    sort_values: bool = False,
+    dtype: tp.Any = np.int32,
+) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """
+        Groups values by rows into CSR arrays (indptr, indices):
+        values of row i are indices[indptr[i]:indptr[i + 1]].
+        Values keep their input order inside a row unless sort_values.
+    """
+    rows = np.asarray(rows)
+    values = np.asarray(values)
+    if sort_values:
+        order = np.lexsort((values, rows))
+    else:
+        order = np.argsort(rows, kind="stable")
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+
+    return indptr, values[order].astype(dtype)
+
+
+def get_rows(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    rows: tp.Iterable[int],
+) -> tp.List[np.ndarray]:
+    return [indices[indptr[row]:indptr[row + 1]] for row in rows]
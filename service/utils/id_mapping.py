@@ -0,0 +1,93 @@
+import typing as tp
+
+import numpy as np
+
+from service.utils.artifact_store import ArtifactStore
+
+# dense lookup table is used while it is not much larger than ids
+DENSE_MAX_SPAN = 4
+UNKNOWN = -1
+
+
+class IdMapping:
+    """
+        Mapping of external ids to inner indices and back, kept in arrays.
+        Inner index of id is its position in `external_ids`.
+        Dense ids are looked up in table indexed by `id - low`,
+        sparse ids are searched in sorted ids. Arrays can be
+        memory-mapped from the artifact store.
+    """
+
+    def __init__(
+        self,
+        external_ids: np.ndarray,
+        lookup: tp.Optional[tp.Dict[str, np.ndarray]] = None,
+    ):
+        self.external_ids = external_ids
+        if lookup is None:
+            lookup = self.build_lookup(external_ids)
+        self.lookup = lookup
+
+    @staticmethod
+    def build_lookup(external_ids: np.ndarray) -> tp.Dict[str, np.ndarray]:
+        ids = np.asarray(external_ids, dtype=np.int64)
+        dtype = np.int32 if len(ids) < np.iinfo(np.int32).max else np.int64
+        if len(ids) and ids.max() - ids.min() < DENSE_MAX_SPAN * len(ids):
+            low = ids.min()
+            dense = np.full(ids.max() - low + 1, UNKNOWN, dtype=dtype)
+            dense[ids - low] = np.arange(len(ids), dtype=dtype)
+            return {"dense": dense, "low": np.array([low])}
+
+        order = np.argsort(ids, kind="stable")
+        return {"sorted_ids": ids[order], "order": order.astype(dtype)}
+
+    def __len__(self) -> int:
+        return len(self.external_ids)
+
+    def __contains__(self, external_id: int) -> bool:
+        return self.to_inner([external_id])[0] != UNKNOWN
+
+    def to_inner(self, external_ids: tp.Iterable[int]) -> np.ndarray:
+        """
+            Inner indices of ids, UNKNOWN for ids out of mapping.
+        """
+        ids = np.asarray(external_ids, dtype=np.int64).reshape(-1)
+        inner = np.full(len(ids), UNKNOWN, dtype=np.int64)
+
+        if "dense" in self.lookup:
+            dense = self.lookup["dense"]
+            pos = ids - self.lookup["low"][0]
+            valid = (pos >= 0) & (pos < len(dense))
+            inner[valid] = dense[pos[valid]]
+        elif len(self.lookup["sorted_ids"]):
+            sorted_ids = self.lookup["sorted_ids"]
+            pos = np.searchsorted(sorted_ids, ids)
+            pos[pos == len(sorted_ids)] = 0
+            found = sorted_ids[pos] == ids
+            inner[found] = self.lookup["order"][pos[found]]
+
+        return inner
+
+    def to_external(self, inner_idx: tp.Iterable[int]) -> np.ndarray:
+        return np.asarray(self.external_ids)[np.asarray(inner_idx)]
+
+    def save(self, store: ArtifactStore, name: str) -> None:
+        store.save(name, self.external_ids)
+        for key, array in self.lookup.items():
+            store.save(f"{name}_{key}", array)
+
+    @classmethod
+    def load(cls, store: ArtifactStore, name: str) -> "IdMapping":
+        """
+            Memory-maps ids and their lookup, builds lookup if missing.
+        """
+        external_ids = store.load(name)
+        for keys in (("dense", "low"), ("sorted_ids", "order")):
+            names = [f"{name}_{key}" for key in keys]
+            if store.exists(*names, sources=[store.array_path(name)]):
+                return cls(
+                    external_ids,
+                    {key: store.load(f"{name}_{key}") for key in keys},
+                )
+
+        return cls(external_ids)
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import typing as tp
+
+import nmslib
+import numpy as np
+
+DATA_SUFFIX = ".dat"
+CHECKSUM_SUFFIX = ".sha1"
+
+
+def _init_index(approximate_search: tp.Dict):
+    return nmslib.init(
+        method=approximate_search["method"],
+        space=approximate_search["space_name"],
+        data_type=nmslib.DataType.DENSE_VECTOR,
+    )
+
+
+def get_checksum(
+    item_embeddings: np.ndarray,
+    approximate_search: tp.Dict,
+) -> str:
+    """
+        Checksum of embeddings and of params the index was built with.
+    """
+    checksum = hashlib.sha1()
+    checksum.update(np.ascontiguousarray(item_embeddings).data)
+    checksum.update(str(item_embeddings.shape).encode())
+    for key in ("method", "space_name", "index_time_params"):
+        checksum.update(repr(approximate_search[key]).encode())
+
+    return checksum.hexdigest()
+
+
+def build_index(item_embeddings: np.ndarray, approximate_search: tp.Dict):
+    index = _init_index(approximate_search)
+    index.addDataPointBatch(item_embeddings)
+    index.createIndex(approximate_search["index_time_params"])
+
+    return index
+
+
+def save_index(index, index_path: str, checksum: str) -> None:
+    """
+        Saves index with its data. Files are renamed into place and
+        checksum is written last, so a matching checksum means
+        the index files are complete.
+    """
+    path_tmp = f"{index_path}.tmp-{os.getpid()}"
+    index.saveIndex(path_tmp, save_data=True)
+
+    os.replace(path_tmp, index_path)
+    os.replace(path_tmp + DATA_SUFFIX, index_path + DATA_SUFFIX)
+    with open(path_tmp + CHECKSUM_SUFFIX, "w") as file:
+        file.write(checksum)
+    os.replace(path_tmp + CHECKSUM_SUFFIX, index_path + CHECKSUM_SUFFIX)
+
+
+def _read_checksum(index_path: str) -> tp.Optional[str]:
+    path_checksum = index_path + CHECKSUM_SUFFIX
+    if not os.path.isfile(path_checksum):
+        return None
+
+    with open(path_checksum) as file:
+        return file.read().strip()
+
+
+def load_or_build_index(
+    item_embeddings: np.ndarray,
+    approximate_search: tp.Dict,
+    index_path: tp.Optional[str] = None,
+):
+    """
+        Loads saved index if it was built from the same embeddings,
+        otherwise builds it and saves for the next start.
+    """
+    if index_path is None:
+        index = build_index(item_embeddings, approximate_search)
+
+    else:
+        checksum = get_checksum(item_embeddings, approximate_search)
+        if _read_checksum(index_path) == checksum:
+            index = _init_index(approximate_search)
+            index.loadIndex(index_path, load_data=True)
+        else:
+            index = build_index(item_embeddings, approximate_search)
+            save_index(index, index_path, checksum)
+
+    index.setQueryTimeParams(approximate_search["query_time_params"])
+    return index
+
+
+def get_top_k_checksum(
+    user_embeddings: np.ndarray,
+    item_embeddings: np.ndarray,
+    approximate_search: tp.Dict,
+    k: int,
+    scorer: str = "nmslib",
+    seen: tp.Optional[tp.Tuple[np.ndarray, np.ndarray]] = None,
+) -> str:
+    """
+        Checksum of everything top-k depends on, `seen` is CSR
+        (indptr, indices) of items excluded from top-k, None if
+        seen items are not filtered.
+    """
+    checksum = hashlib.sha1(
+        get_checksum(item_embeddings, approximate_search).encode()
+    )
+    checksum.update(scorer.encode())
+    checksum.update(np.ascontiguousarray(user_embeddings).data)
+    checksum.update(repr(approximate_search["query_time_params"]).encode())
+    checksum.update(str(k).encode())
+    checksum.update(f"filter_seen={seen is not None}".encode())
+    if seen is not None:
+        for array in seen:
+            checksum.update(np.ascontiguousarray(array).data)
+
+    return checksum.hexdigest()
+
+
+def save_top_k(top_k: np.ndarray, path: str, checksum: str) -> None:
+    path_tmp = f"{path}.tmp-{os.getpid()}.npy"
+    np.save(path_tmp, top_k)
+    os.replace(path_tmp, path)
+
+    with open(path_tmp + CHECKSUM_SUFFIX, "w") as file:
+        file.write(checksum)
+    os.replace(path_tmp + CHECKSUM_SUFFIX, path + CHECKSUM_SUFFIX)
+
+
+def load_top_k(path: str, checksum: str) -> tp.Optional[np.ndarray]:
+    """
+        Memory-maps precomputed top-k if it matches current embeddings.
+    """
+    if _read_checksum(path) != checksum:
+        return None
+
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,40 @@
+import typing as tp
+
+import numpy as np
+
+
+class FoldIn:
+    """
+        Vectors of users outside of the model from items of their history,
+        one step of implicit ALS with fixed item embeddings Y:
+        u = (Y^T Y + alpha * Y_h^T Y_h + reg * I)^-1 (1 + alpha) Y_h^T 1.
+        Gramian Y^T Y is computed once, a user costs a d x d solve.
+    """
+
+    def __init__(
+        self,
+        item_embeddings: np.ndarray,
+        regularization: float = 0.1,
+        alpha: float = 10.0,
+    ):
+        self.item_embeddings = np.asarray(item_embeddings)
+        self.alpha = alpha
+        embeddings = self.item_embeddings.astype(np.float64)
+        self.gram = embeddings.T @ embeddings + regularization * np.eye(
+            embeddings.shape[1]
+        )
+
+    def get_vectors(self, histories_idx: tp.List[np.ndarray]) -> np.ndarray:
+        """
+            User vectors for histories of item indices (not empty).
+        """
+        dim = self.gram.shape[0]
+        lhs = np.repeat(self.gram[np.newaxis], len(histories_idx), axis=0)
+        rhs = np.zeros((len(histories_idx), dim, 1))
+        for row, items_idx in enumerate(histories_idx):
+            embeddings = self.item_embeddings[items_idx].astype(np.float64)
+            lhs[row] += self.alpha * embeddings.T @ embeddings
+            rhs[row, :, 0] = (1 + self.alpha) * embeddings.sum(axis=0)
+
+        vectors = np.linalg.solve(lhs, rhs)[:, :, 0]
+        return vectors.astype(self.item_embeddings.dtype)
@@ -1,11 +1,24 @@
 import typing as tp
 
-import nmslib
 import numpy as np
 import yaml
-from rectools import Columns
 
-from service.utils.common_artifact import interactions
+from service.log import app_logger
+from service.utils.common_artifact import (
+    items,
+    items_mapping,
+    seen_indices,
+    seen_indptr,
+    users_mapping,
+)
+from service.utils.csr import get_rows
+from service.utils.id_mapping import UNKNOWN
+from service.utils.matrix_factorization.ann_index import (
+    get_top_k_checksum,
+    load_top_k,
+)
+from service.utils.matrix_factorization.fold_in import FoldIn
+from service.utils.matrix_factorization.scorers import get_scorer
 
 
 class RecommendMF:
@@ -13,50 +26,178 @@ class RecommendMF:
         Class for recommendation method Matrix Factorization
     """
     path_config_run = "./service/config/inference-MF.cfg.yml"
-    def __init__(self):
+    def __init__(self, path_config_run: tp.Optional[str] = None):
         """
         Download model artifact
         """
-        with open(self.path_config_run) as models_config:
+        if path_config_run is None:
+            path_config_run = self.path_config_run
+
+        with open(path_config_run) as models_config:
             params = yaml.safe_load(models_config)
 
-        self.user_embeddings = np.load(params["user_embeddings"])
-        self.item_embeddings = np.load(params["item_embeddings"])
+        self.user_embeddings = np.load(
+            params["user_embeddings"], mmap_mode="r"
+        )
+        self.item_embeddings = np.load(
+            params["item_embeddings"], mmap_mode="r"
+        )
+        # rows are indexed by inner ids of the common artifacts,
+        # reload of mismatched embeddings keeps the old instance
+        if len(self.user_embeddings) != len(users_mapping):
+            raise ValueError(
+                f"{len(self.user_embeddings)} user embeddings "
+                f"for {len(users_mapping)} users"
+            )
+        if len(self.item_embeddings) != len(items):
+            raise ValueError(
+                f"{len(self.item_embeddings)} item embeddings "
+                f"for {len(items)} items"
+            )
+
+        """
+        Initialize scorer: approximate (nmslib) or exact search
+        """
+        self.scorer = get_scorer(self.item_embeddings, params)
+        self.filter_seen = params.get("filter_seen", False)
+
+        """
+        Precomputed top-k of known users
+        """
+        self.top_k = None
+        top_k_params = params.get("precomputed_top_k", {})
+        if top_k_params.get("enabled", False):
+            self.top_k = load_top_k(
+                top_k_params["path"],
+                get_top_k_checksum(
+                    self.user_embeddings,
+                    self.item_embeddings,
+                    params["approximate_search"],
+                    top_k_params["k"],
+                    scorer=params.get("scorer", "nmslib"),
+                    seen=(
+                        (seen_indptr, seen_indices)
+                        if self.filter_seen else None
+                    ),
+                ),
+            )
+            if self.top_k is None:
+                app_logger.warning(
+                    "Precomputed top-k is missing or stale, "
+                    "scorer is used"
+                )
 
-        approximate_search = params["approximate_search"]
+        """
+        Create item and user mapping
+        """
+        self.users_mapping = users_mapping
+        self.items_mapping = items_mapping
+        self.item_ids = np.asarray(items)
 
         """
-        Initialize index for approximate search
+        Fold-in of users outside of the model from history in request
         """
-        self.index = nmslib.init(
-            method=approximate_search["method"],
-            space=approximate_search["space_name"],
-            data_type=nmslib.DataType.DENSE_VECTOR,
+        fold_in_params = params.get("fold_in", {})
+        self.fold_in = FoldIn(
+            self.item_embeddings,
+            regularization=fold_in_params.get("regularization", 0.1),
+            alpha=fold_in_params.get("alpha", 10.0),
         )
-        self.index.addDataPointBatch(self.item_embeddings)
-        self.index.createIndex(approximate_search["index_time_params"])
-        self.index.setQueryTimeParams(
-            approximate_search["query_time_params"]
+        self.max_history = fold_in_params.get("max_history", 100)
+
+    def get_seen(self, avatars_idx: np.ndarray) -> tp.List[np.ndarray]:
+        return get_rows(seen_indptr, seen_indices, avatars_idx)
+
+    def _has_top_k(self, k_recs: int) -> bool:
+        return self.top_k is not None and k_recs <= self.top_k.shape[1]
+
+    def _recommend_idx(
+        self,
+        avatars_idx: np.ndarray,
+        k_recs: int,
+    ) -> tp.List[np.ndarray]:
+        """
+        item indices for known users
+        """
+        if self._has_top_k(k_recs):
+            rows = self.top_k[avatars_idx, :k_recs]
+            return [items_idx[items_idx >= 0] for items_idx in rows]
+
+        exclude = self.get_seen(avatars_idx) if self.filter_seen else None
+        return self.scorer.query_batch(
+            self.user_embeddings[avatars_idx], k_recs, exclude=exclude
         )
 
+    def _get_history_idx(self, history: tp.List[int]) -> np.ndarray:
         """
-        Create item and user mapping
+        known item indices of last `max_history` items of history
+        """
+        items_idx = self.items_mapping.to_inner(history[-self.max_history:])
+        return np.unique(items_idx[items_idx != UNKNOWN])
+
+    def _recommend_cold_idx(
+        self,
+        histories_idx: tp.List[np.ndarray],
+        k_recs: int,
+    ) -> tp.List[np.ndarray]:
+        """
+        item indices for users folded in from history
         """
-        users_mapping = dict(enumerate(interactions[Columns.User].unique()))
-        self.users_inv_mapping = {v: k for k, v in users_mapping.items()}
-        self.items_mapping = dict(
-            enumerate(interactions[Columns.Item].unique())
+        exclude = histories_idx if self.filter_seen else None
+        return self.scorer.query_batch(
+            self.fold_in.get_vectors(histories_idx), k_recs, exclude=exclude
         )
 
-    def recommend(self, user_id: int, k_recs: int) -> tp.List[int]:
+    def uses_history(self, user_id: int) -> bool:
+        """
+        history is used for users outside of the model only
+        """
+        return user_id not in self.users_mapping
+
+    def recommend(
+        self,
+        user_id: int,
+        k_recs: int,
+        history: tp.Optional[tp.List[int]] = None,
+    ) -> tp.List[int]:
         """
         get reco
         """
-        if user_id in self.users_inv_mapping:
-            avatar_idx = self.users_inv_mapping[user_id]
-            items_idx = self.index.knnQuery(
-                self.user_embeddings[avatar_idx], k=k_recs
-            )[0].tolist()
-            return [self.items_mapping[idx] for idx in items_idx]
-        else:
-            return []
+        histories = None if history is None else [history]
+        return self.recommend_batch([user_id], k_recs, histories)[0]
+
+    def recommend_batch(
+        self,
+        user_ids: tp.List[int],
+        k_recs: int,
+        histories: tp.Optional[tp.List[tp.Optional[tp.List[int]]]] = None,
+    ) -> tp.List[tp.List[int]]:
+        """
+        get reco for several users with one batched scorer query,
+        unknown users with history are folded in
+        """
+        recs: tp.List[tp.List[int]] = [[] for _ in user_ids]
+        avatars_idx = self.users_mapping.to_inner(user_ids)
+        positions = np.flatnonzero(avatars_idx != UNKNOWN)
+        if len(positions):
+            items_idx = self._recommend_idx(avatars_idx[positions], k_recs)
+            for pos, user_items_idx in zip(positions, items_idx):
+                recs[pos] = self.item_ids[user_items_idx].tolist()
+
+        if histories is None:
+            return recs
+
+        cold_positions, histories_idx = [], []
+        for pos in np.flatnonzero(avatars_idx == UNKNOWN):
+            if histories[pos]:
+                history_idx = self._get_history_idx(histories[pos])
+                if len(history_idx):
+                    cold_positions.append(pos)
+                    histories_idx.append(history_idx)
+
+        if cold_positions:
+            items_idx = self._recommend_cold_idx(histories_idx, k_recs)
+            for pos, user_items_idx in zip(cold_positions, items_idx):
+                recs[pos] = self.item_ids[user_items_idx].tolist()
+
+        return recs
@@ -0,0 +1,162 @@
+import typing as tp
+
+import numpy as np
+
+from service.utils.matrix_factorization.ann_index import load_or_build_index
+
+
+class NmslibScorer:
+    """
+        Approximate top-k by nmslib index.
+    """
+
+    def __init__(self, item_embeddings: np.ndarray, params: tp.Dict):
+        approximate_search = params["approximate_search"]
+        self.index = load_or_build_index(
+            item_embeddings,
+            approximate_search,
+            index_path=approximate_search.get("index_path"),
+        )
+        self.num_threads = approximate_search.get("query_threads", 0)
+
+    def _query(self, vectors: np.ndarray, k: int) -> tp.List[np.ndarray]:
+        neighbours = self.index.knnQueryBatch(
+            vectors, k=k, num_threads=self.num_threads
+        )
+        return [items for items, _ in neighbours]
+
+    def query_batch(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        exclude: tp.Optional[tp.List[np.ndarray]] = None,
+    ) -> tp.List[np.ndarray]:
+        """
+            Item indices ordered by score without excluded items.
+            Users left with less than k items after filtering are
+            queried again with larger k, so usually one query is made.
+        """
+        if exclude is None:
+            return self._query(vectors, k)
+
+        n_items = len(self.index)
+        items_idx: tp.List[np.ndarray] = [None] * len(vectors)
+        pending = np.arange(len(vectors))
+        k_query = k
+        while len(pending):
+            missing = []
+            found = self._query(vectors[pending], k_query)
+            for row, items in zip(pending, found):
+                kept = items[~np.isin(items, exclude[row])]
+                items_idx[row] = kept[:k]
+                exhausted = len(items) < k_query or k_query >= n_items
+                if len(kept) < k and not exhausted:
+                    missing.append(row)
+
+            pending = np.array(missing, dtype=np.int64)
+            if len(pending):
+                max_excluded = max(len(exclude[row]) for row in pending)
+                k_query = min(max(2 * k_query, k + max_excluded), n_items)
+
+        return items_idx
+
+
+class ExactScorer:
+    """
+        Exact top-k by dot product of embeddings (negdotprod space):
+        matrix product for a batch of users, argpartition for top-k.
+        Excluded items are masked before selection,
+        so k results are returned while there are enough items.
+    """
+
+    def __init__(self, item_embeddings: np.ndarray, params: tp.Dict):
+        space_name = params["approximate_search"]["space_name"]
+        if space_name != "negdotprod":
+            raise ValueError(
+                f"Exact scorer supports 'negdotprod' space, got {space_name}"
+            )
+
+        exact_search = params.get("exact_search", {})
+        self.item_embeddings_t = np.ascontiguousarray(
+            item_embeddings.T, dtype=np.float32
+        )
+        self.batch_size = exact_search.get("batch_size", 1024)
+
+    def _query_chunk(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        exclude: tp.Optional[tp.List[np.ndarray]],
+    ) -> tp.List[np.ndarray]:
+        scores = np.asarray(vectors, dtype=np.float32) @ self.item_embeddings_t
+        if exclude is not None:
+            rows = np.repeat(
+                np.arange(len(exclude)), [len(e) for e in exclude]
+            )
+            scores[rows, np.concatenate(exclude).astype(np.int64)] = -np.inf
+
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1).astype(np.int32)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            items[np.isfinite(items_scores)]
+            for items, items_scores in zip(top, top_scores)
+        ]
+
+    def query_batch(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        exclude: tp.Optional[tp.List[np.ndarray]] = None,
+    ) -> tp.List[np.ndarray]:
+        items_idx: tp.List[np.ndarray] = []
+        for start in range(0, len(vectors), self.batch_size):
+            stop = start + self.batch_size
+            items_idx.extend(
+                self._query_chunk(
+                    vectors[start:stop],
+                    k,
+                    None if exclude is None else exclude[start:stop],
+                )
+            )
+
+        return items_idx
+
+
+SCORERS = {
+    "nmslib": NmslibScorer,
+    "exact": ExactScorer,
+}
+
+
+def get_scorer(item_embeddings: np.ndarray, params: tp.Dict):
+    return SCORERS[params.get("scorer", "nmslib")](item_embeddings, params)
+
+
+def query_top_k(
+    scorer,
+    vectors: np.ndarray,
+    k: int,
+    batch_size: int = 10000,
+    exclude: tp.Optional[tp.List[np.ndarray]] = None,
+) -> np.ndarray:
+    """
+        Top-k item indices for every vector as int32 matrix,
+        rows with less than k items are padded with -1.
+    """
+    top_k = np.full((len(vectors), k), -1, dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        stop = start + batch_size
+        items_idx = scorer.query_batch(
+            vectors[start:stop],
+            k,
+            None if exclude is None else exclude[start:stop],
+        )
+        for row, items in enumerate(items_idx, start):
+            top_k[row, :len(items)] = items
+
+    return top_k
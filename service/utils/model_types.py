@@ -0,0 +1,7 @@
+from service.utils.matrix_factorization.reco_mf import RecommendMF
+from service.utils.user_knn.reco_userKNN import RecommendUserKNN
+
+MODEL_TYPES = {
+    "user_knn": RecommendUserKNN,
+    "matrix_factorization": RecommendMF,
+}
@@ -0,0 +1,174 @@
+import os
+import threading
+import typing as tp
+
+import yaml
+
+from service.log import app_logger
+
+Signature = tp.Tuple[tp.Tuple[str, float], ...]
+
+
+def _find_files(value: tp.Any) -> tp.Iterator[str]:
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _find_files(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _find_files(item)
+    elif isinstance(value, str) and os.path.isfile(value):
+        yield value
+
+
+def get_artifact_files(path_config: str) -> tp.List[str]:
+    """
+        Model config and files it refers to.
+    """
+    with open(path_config) as models_config:
+        params = yaml.safe_load(models_config)
+
+    return [path_config, *sorted(set(_find_files(params)))]
+
+
+class ReloadMarker:
+    """
+        Reload requests shared by workers of a host: a request is
+        a line "<pid> <model name>" appended to the file (empty name
+        for all models). Every worker reads lines appended since its
+        previous check and skips its own requests.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self._offset = os.path.getsize(path)
+        except OSError:
+            self._offset = 0
+
+    def notify(self, model_name: tp.Optional[str] = None) -> None:
+        with open(self.path, "a") as marker:
+            marker.write(f"{os.getpid()} {model_name or ''}\n")
+
+    def check(self) -> tp.List[tp.Optional[str]]:
+        """
+            Models requested by other workers since previous check,
+            None stands for all models.
+        """
+        try:
+            with open(self.path, "rb") as marker:
+                if os.fstat(marker.fileno()).st_size < self._offset:
+                    self._offset = 0  # file is recreated
+                marker.seek(self._offset)
+                data = marker.read()
+        except FileNotFoundError:
+            return []
+
+        # the last line may be written at the moment
+        data = data[:data.rfind(b"\n") + 1]
+        self._offset += len(data)
+
+        pid = str(os.getpid())
+        requests: tp.List[tp.Optional[str]] = []
+        for line in data.decode().splitlines():
+            sender, _, model_name = line.partition(" ")
+            if sender != pid:
+                requests.append(model_name or None)
+
+        return requests
+
+
+class ModelWatcher:
+    """
+        Polls modification time of artifacts of loaded models
+        and reloads the model in pipeline when they change.
+        Every worker runs its own watcher, so all workers
+        pick up new artifacts. With a reload marker the watcher
+        also reloads models requested by other workers.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        interval_s: float,
+        marker: tp.Optional[ReloadMarker] = None,
+        watch_artifacts: bool = True,
+    ):
+        self.pipeline = pipeline
+        self.interval_s = interval_s
+        self.marker = marker
+        self.watch_artifacts = watch_artifacts
+        self._signatures: tp.Dict[str, Signature] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="model_watcher", daemon=True
+        )
+
+    def _get_signature(self, model_name: str) -> Signature:
+        path_config = self.pipeline.models_config[model_name]["config"]
+        signature = []
+        for path in get_artifact_files(path_config):
+            try:
+                signature.append((path, os.path.getmtime(path)))
+            except OSError:
+                signature.append((path, -1.0))
+
+        return tuple(signature)
+
+    def check(self) -> tp.List[str]:
+        """
+            Reloads models requested by other workers and models
+            with changed artifacts, returns their names.
+        """
+        reloaded: tp.List[str] = []
+        if self.marker is not None:
+            requests = self.marker.check()
+            if None in requests:
+                requests = [None]
+            for requested in dict.fromkeys(requests):
+                # models not loaded yet will load new artifacts anyway
+                if (
+                    requested is not None
+                    and requested not in self.pipeline.loaded_models()
+                ):
+                    continue
+                app_logger.info(f"Reload of model {requested} requested")
+                reloaded.extend(self.pipeline.reload(requested))
+            self._update_signatures(reloaded)
+
+        if not self.watch_artifacts:
+            return reloaded
+
+        for model_name in self.pipeline.loaded_models():
+            if model_name in reloaded:
+                continue
+
+            signature = self._get_signature(model_name)
+            previous = self._signatures.setdefault(model_name, signature)
+            if signature == previous:
+                continue
+
+            app_logger.info(f"Artifacts of model {model_name} changed")
+            reloaded.extend(self.pipeline.reload(model_name))
+            self._update_signatures(reloaded)
+
+        return reloaded
+
+    def _update_signatures(self, model_names: tp.List[str]) -> None:
+        # reload may rewrite derived artifacts, e.g. ANN index
+        if self.watch_artifacts:
+            for name in model_names:
+                self._signatures[name] = self._get_signature(name)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.check()
+            except Exception as exc:  # pylint: disable=broad-except
+                app_logger.error(f"Model reload failed: {exc}")
+
+    def start(self) -> None:
+        self._update_signatures(self.pipeline.loaded_models())
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,192 @@
+import os
+import typing as tp
+
+import numpy as np
+import pandas as pd
+
+from service.utils.artifact_store import load_array_dir, save_array_dir
+
+
+class OfflineRecoIndex:
+    """
+        CSR-style index of precomputed recommendations: sorted users,
+        offsets into one contiguous int32 array of items.
+        Recommendations of users[i] are items[offsets[i]:offsets[i + 1]].
+    """
+
+    files = ("users", "offsets", "items")
+
+    def __init__(
+        self,
+        users: np.ndarray,
+        offsets: np.ndarray,
+        items: np.ndarray,
+    ):
+        self.users = users
+        self.offsets = offsets
+        self.items = items
+
+    @classmethod
+    def from_frame(
+        cls,
+        reco: pd.DataFrame,
+        user_col: str = "user_id",
+        item_col: str = "item_id",
+        rank_col: str = "rank",
+    ) -> "OfflineRecoIndex":
+        """
+            Builds index from (user, item[, rank]) rows. Items of a user
+            keep rank order, or the row order if there is no rank.
+        """
+        keys = [reco[user_col].values]
+        if rank_col in reco.columns:
+            keys.insert(0, reco[rank_col].values)
+        order = np.lexsort(keys)
+
+        users_sorted = reco[user_col].values[order]
+        users, starts = np.unique(users_sorted, return_index=True)
+        offsets = np.append(starts, len(users_sorted)).astype(np.int64)
+        items = reco[item_col].values[order].astype(np.int32)
+
+        return cls(users.astype(np.int64), offsets, items)
+
+    @classmethod
+    def from_lists(
+        cls,
+        user_ids: tp.Sequence[int],
+        recs: tp.Sequence[tp.Sequence[int]],
+    ) -> "OfflineRecoIndex":
+        """
+            Builds index from recommendations of unique users.
+        """
+        lengths = np.array([len(user_recs) for user_recs in recs], np.int64)
+        items = np.fromiter(
+            (item for user_recs in recs for item in user_recs),
+            dtype=np.int32,
+            count=lengths.sum(),
+        )
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        return cls.merge([
+            cls(np.asarray(user_ids, dtype=np.int64), offsets, items)
+        ])
+
+    @classmethod
+    def merge(
+        cls,
+        indexes: tp.Sequence["OfflineRecoIndex"],
+    ) -> "OfflineRecoIndex":
+        """
+            Joins indexes of disjoint users, users are sorted again.
+        """
+        if not indexes:
+            return cls(
+                np.array([], dtype=np.int64),
+                np.zeros(1, dtype=np.int64),
+                np.array([], dtype=np.int32),
+            )
+
+        users = np.concatenate([index.users for index in indexes])
+        shifts = np.cumsum([0] + [len(index.items) for index in indexes])
+        starts = np.concatenate([
+            index.offsets[:-1] + shift
+            for index, shift in zip(indexes, shifts)
+        ]).astype(np.int64)
+        lengths = np.concatenate([np.diff(index.offsets) for index in indexes])
+        items = np.concatenate([index.items for index in indexes])
+
+        order = np.argsort(users, kind="stable")
+        lengths = lengths[order]
+        offsets = np.zeros(len(users) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.arange(offsets[-1]) + np.repeat(
+            starts[order] - offsets[:-1], lengths
+        )
+
+        return cls(users[order], offsets, items[positions].astype(np.int32))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+            Rows (user_id, item_id, rank) as in offline reco csv.
+        """
+        lengths = np.diff(self.offsets)
+        return pd.DataFrame({
+            "user_id": np.repeat(self.users, lengths),
+            "item_id": self.items,
+            "rank": np.arange(len(self.items))
+            - np.repeat(self.offsets[:-1], lengths) + 1,
+        })
+
+    @classmethod
+    def from_csv(cls, path: str) -> "OfflineRecoIndex":
+        return cls.from_frame(pd.read_csv(path))
+
+    def save(self, path: str, replace: bool = False) -> None:
+        save_array_dir(
+            path,
+            {name: getattr(self, name) for name in self.files},
+            replace=replace,
+        )
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        mmap_mode: tp.Optional[str] = "r",
+    ) -> "OfflineRecoIndex":
+        return cls(*load_array_dir(path, cls.files, mmap_mode=mmap_mode))
+
+    @classmethod
+    def load_or_build(
+        cls,
+        path_index: tp.Optional[str],
+        path_csv: str,
+    ) -> "OfflineRecoIndex":
+        """
+            Memory-maps saved index, or builds it from csv and saves it.
+            Index older than csv is built again.
+        """
+        exists = path_index is not None and os.path.isdir(path_index)
+        if exists and (
+            os.path.getmtime(path_index) >= os.path.getmtime(path_csv)
+        ):
+            return cls.load(path_index)
+
+        index = cls.from_csv(path_csv)
+        if path_index is not None:
+            index.save(path_index, replace=exists)
+
+        return index
+
+    def get(self, user_id: int, k_recs: int) -> tp.List[int]:
+        pos = np.searchsorted(self.users, user_id)
+        if pos == len(self.users) or self.users[pos] != user_id:
+            return []
+
+        start = self.offsets[pos]
+        stop = min(self.offsets[pos + 1], start + k_recs)
+        return self.items[start:stop].tolist()
+
+    def get_batch(
+        self,
+        user_ids: tp.List[int],
+        k_recs: int,
+    ) -> tp.List[tp.List[int]]:
+        if len(self.users) == 0:
+            return [[] for _ in user_ids]
+
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        pos = np.searchsorted(self.users, user_ids)
+        pos = np.minimum(pos, len(self.users) - 1)
+        found = self.users[pos] == user_ids
+
+        starts = self.offsets[pos]
+        stops = np.minimum(self.offsets[pos + 1], starts + k_recs)
+        return [
+            self.items[start:stop].tolist() if is_found else []
+            for start, stop, is_found in zip(starts, stops, found)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.users)
@@ -0,0 +1,113 @@
+import typing as tp
+
+import numpy as np
+import pandas as pd
+
+from service.utils.artifact_store import as_ids
+from service.utils.id_mapping import UNKNOWN, IdMapping
+
+SEGMENT_ARRAYS = (
+    "popular_segment_users",
+    "popular_segment_of_user",
+    "popular_segment_indptr",
+    "popular_segment_items",
+)
+
+
+def build_segments(
+    popular_items: np.ndarray,
+    user_segments: pd.DataFrame,
+    segment_items: pd.DataFrame,
+) -> tp.Dict[str, np.ndarray]:
+    """
+        Popular items of segments (e.g. age / sex bucket) as CSR,
+        every row is items of segment in order of the frame
+        followed by the rest of global popular items.
+
+        user_segments: user_id, segment
+        segment_items: segment, item_id ordered by popularity
+    """
+    codes, segments = pd.factorize(segment_items["segment"])
+    rows = []
+    for code in range(len(segments)):
+        items = pd.unique(segment_items["item_id"].values[codes == code])
+        rest = np.asarray(popular_items)[
+            ~np.isin(popular_items, items)
+        ]
+        rows.append(np.concatenate([items, rest]))
+
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=indptr[1:])
+    user_segments = user_segments.drop_duplicates("user_id")
+    return {
+        "popular_segment_users": as_ids(user_segments["user_id"].values),
+        "popular_segment_of_user": segments.get_indexer(
+            user_segments["segment"]
+        ).astype(np.int32),
+        "popular_segment_indptr": indptr,
+        "popular_segment_items": as_ids(
+            np.concatenate(rows) if rows else np.array([])
+        ),
+    }
+
+
+class PopularFallback:
+    """
+        Tops up recommendations with popular items keeping their order.
+        Users of a known segment get popular items of their segment,
+        others get global popular items. Lists are precomputed,
+        so filling k items looks at no more than 2k of them.
+    """
+
+    def __init__(
+        self,
+        popular_items: np.ndarray,
+        segments: tp.Optional[tp.Dict[str, np.ndarray]] = None,
+    ):
+        self.popular_items = np.asarray(popular_items)
+        self.segments = segments
+        if segments is not None:
+            self.users_mapping = IdMapping(segments["popular_segment_users"])
+
+    def get_popular(self, user_id: tp.Optional[int] = None) -> np.ndarray:
+        if self.segments is None or user_id is None:
+            return self.popular_items
+
+        inner = self.users_mapping.to_inner([user_id])[0]
+        if inner == UNKNOWN:
+            return self.popular_items
+
+        segment = self.segments["popular_segment_of_user"][inner]
+        if segment == UNKNOWN:
+            return self.popular_items
+
+        indptr = self.segments["popular_segment_indptr"]
+        return self.segments["popular_segment_items"][
+            indptr[segment]:indptr[segment + 1]
+        ]
+
+    def fill(
+        self,
+        curr_recs: tp.List[int],
+        k_recs: int,
+        user_id: tp.Optional[int] = None,
+    ) -> tp.List[int]:
+        """
+            Appends popular items absent in `curr_recs` until
+            there are `k_recs` of them or popular items run out.
+        """
+        if len(curr_recs) >= k_recs:
+            return curr_recs
+
+        recs = list(curr_recs)
+        seen = set(recs)
+        # every item of recs can skip at most one popular item
+        candidates = self.get_popular(user_id)[:k_recs + len(recs)]
+        for item in candidates.tolist():
+            if item not in seen:
+                recs.append(item)
+                seen.add(item)
+                if len(recs) == k_recs:
+                    break
+
+        return recs
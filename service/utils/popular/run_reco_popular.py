@@ -1,21 +1,39 @@
 import typing as tp
 
-from service.utils.common_artifact import popular_items
+import pandas as pd
+
+from service.utils.common_artifact import data, popular_items, store
+from service.utils.popular.popular_fallback import (
+    SEGMENT_ARRAYS,
+    PopularFallback,
+    build_segments,
+)
+
+segments_config = data.get("popular_segments")
+if segments_config is None:
+    segments = None
+elif store.exists(
+    *SEGMENT_ARRAYS,
+    sources=[segments_config["users"], segments_config["items"]],
+):
+    segments = {name: store.load(name) for name in SEGMENT_ARRAYS}
+else:
+    segments = build_segments(
+        popular_items,
+        pd.read_csv(segments_config["users"]),
+        pd.read_csv(segments_config["items"]),
+    )
+
+popular_fallback = PopularFallback(popular_items, segments)
 
 
 def add_reco_popular(
     k_recs: int,
     curr_recs: tp.List[int],
+    user_id: tp.Optional[int] = None,
 ) -> tp.List[int]:
     """
         The function adds popular to the recommendations,
         if this is not enough.
     """
-    if len(curr_recs) < k_recs:
-        curr_recs = set(curr_recs)
-        for item_pop in popular_items:
-            curr_recs.add(item_pop)
-            if len(curr_recs) == k_recs:
-                return list(curr_recs)
-    else:
-        return curr_recs
+    return popular_fallback.fill(curr_recs, k_recs, user_id)
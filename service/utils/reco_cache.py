@@ -0,0 +1,100 @@
+import sys
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+
+CacheKey = tp.Tuple[str, int, int]
+
+# dict slot, key tuple and OrderedDict link of one entry, approximately
+ENTRY_OVERHEAD = 200
+INT_SIZE = sys.getsizeof(2 ** 40)
+
+
+def _entry_size(items: tp.Tuple[int, ...]) -> int:
+    return ENTRY_OVERHEAD + sys.getsizeof(items) + INT_SIZE * len(items)
+
+
+class RecoCache:
+    """
+        In-process LRU cache of recommendations keyed by
+        (model_name, user_id, k_recs). Entries expire after `ttl_s`,
+        least recently used ones are evicted above `max_entries`
+        or above approximate `max_bytes`.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, max_bytes: int):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._entries: tp.OrderedDict[
+            CacheKey, tp.Tuple[float, tp.Tuple[int, ...], int]
+        ] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: CacheKey) -> tp.Optional[tp.List[int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._pop(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: CacheKey, items: tp.List[int]) -> None:
+        if not self.enabled:
+            return
+
+        items = tuple(items)
+        size = _entry_size(items)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl_s, items, size)
+            self.bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self.bytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, model_name: tp.Optional[str] = None) -> None:
+        """
+            Drops entries of the model, all entries if model is None.
+        """
+        with self._lock:
+            if model_name is None:
+                self._entries.clear()
+                self.bytes = 0
+                return
+
+            for key in [key for key in self._entries if key[0] == model_name]:
+                self._pop(key)
+
+    def stats(self) -> tp.Dict[str, tp.Union[int, float]]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+            }
+
+    def _pop(self, key: CacheKey) -> None:
+        self.bytes -= self._entries.pop(key)[2]
@@ -1,39 +1,176 @@
+import threading
 import typing as tp
 
 import yaml
 
-from service.utils.user_knn.reco_userKNN import RecommendUserKNN
-from service.utils.matrix_factorization.reco_mf import RecommendMF
+from service.log import app_logger
+from service.utils.common_artifact import users
+from service.utils.model_types import MODEL_TYPES
+
+WARM_UP_USERS = 100
+WARM_UP_K_RECS = 10
 
 
 class MainPipeline:
     """
-    Class for recommend all pipeline recsys
+    Class for recommend all pipeline recsys.
+    Keeps registry of models and sends request to model by its name.
     """
 
     path_pipeline = "./service/config/main-pipeline.cfg.yml"
-    def __init__(self):
+    def __init__(self, path_pipeline: tp.Optional[str] = None):
 
         """
         Download type pipeline
         """
-        with open(self.path_pipeline) as models_config:
-            pipeline = yaml.safe_load(models_config)
+        if path_pipeline is None:
+            path_pipeline = self.path_pipeline
 
-        self.type_model = pipeline["type_model"]
+        with open(path_pipeline) as models_config:
+            pipeline = yaml.safe_load(models_config)
 
-        if self.type_model["user_knn"]:
-            self.model = RecommendUserKNN()
+        self.models_config = pipeline["models"]
+        self.default_model = pipeline["default_model"]
+        if self.default_model not in self.models_config:
+            raise ValueError(
+                f"Default model '{self.default_model}' is not configured"
+            )
 
-        elif self.type_model["matrix_factorization"]:
-            self.model = RecommendMF()
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._instances: tp.Dict[tp.Tuple[str, str], tp.Any] = {}
+        self._models: tp.Dict[str, tp.Any] = {}
+        self._reload_listeners: tp.List[tp.Callable[[str], None]] = []
 
+        names = [self.default_model]
+        if not pipeline.get("lazy_load", False):
+            names = list(self.models_config)
 
-    def recommend(self, user_id: int, k_recs: int) -> tp.List[int]:
-        return self.model.recommend(user_id, k_recs)
+        for model_name in names:
+            self.get_model(model_name)
 
+    def resolve_name(self, model_name: tp.Optional[str]) -> str:
+        """
+        Configured model serving the name, registered names
+        without own entry are served by default model.
+        """
+        if model_name is None or model_name not in self.models_config:
+            return self.default_model
+        return model_name
+
+    def add_reload_listener(
+        self,
+        listener: tp.Callable[[str], None],
+    ) -> None:
+        """
+        Listener is called with model name when the model is reloaded,
+        e.g. to drop cached recommendations of the model. First load
+        in a worker does not call it, so entries other workers put
+        to a shared cache are kept.
+        """
+        self._reload_listeners.append(listener)
 
-pipeline = MainPipeline()
+    def get_model(self, model_name: tp.Optional[str] = None):
+        """
+        Returns model by name, loading it on first use.
+        Variants with the same type and config share one instance.
+        """
+        model_name = self.resolve_name(model_name)
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if model_name not in self._models:
+                key = self._get_key(model_name)
+                if key not in self._instances:
+                    self._instances[key] = self._load(key)
+                self._models[model_name] = self._instances[key]
+
+        return self._models[model_name]
+
+    def loaded_models(self) -> tp.List[str]:
+        return list(self._models)
+
+    def _get_key(self, model_name: str) -> tp.Tuple[str, str]:
+        model_config = self.models_config[model_name]
+        return model_config["type_model"], model_config["config"]
+
+    @staticmethod
+    def _load(key: tp.Tuple[str, str]):
+        type_model, path_config = key
+        return MODEL_TYPES[type_model](path_config)
+
+    @staticmethod
+    def _warm_up(model) -> None:
+        """
+        First queries touch mmap'ed pages and lazy structures of model.
+        """
+        model.recommend_batch(
+            users[:WARM_UP_USERS].tolist(), k_recs=WARM_UP_K_RECS
+        )
 
+    def reload(self, model_name: tp.Optional[str] = None) -> tp.List[str]:
+        """
+        Loads new artifacts of the model (of all loaded models if None),
+        warms them up and swaps them in. Requests in progress keep
+        the old instance. Returns names of reloaded models.
+        """
+        with self._reload_lock:
+            names = [model_name] if model_name else list(self._models)
+            keys = list(dict.fromkeys(self._get_key(name) for name in names))
+            reloaded = []
+            for key in keys:
+                app_logger.info(f"Reloading model: {key}")
+                model = self._load(key)
+                self._warm_up(model)
+
+                with self._lock:
+                    bound = [
+                        name for name in self.models_config
+                        if self._get_key(name) == key
+                        and (name in self._models or name == model_name)
+                    ]
+                    self._instances[key] = model
+                    for name in bound:
+                        self._models[name] = model
+                        for listener in self._reload_listeners:
+                            listener(name)
+                reloaded.extend(bound)
+
+        return reloaded
+
+    def uses_history(self, model_name: str, user_id: int) -> bool:
+        """
+        Whether the model scores the user by history in request.
+        """
+        return self.get_model(model_name).uses_history(user_id)
+
+    def recommend(
+        self,
+        model_name: str,
+        user_id: int,
+        k_recs: int,
+        history: tp.Optional[tp.List[int]] = None,
+    ) -> tp.List[int]:
+        """
+        History of items is used for users outside of the model.
+        """
+        if history is None:
+            return self.get_model(model_name).recommend(user_id, k_recs)
+        return self.get_model(model_name).recommend(user_id, k_recs, history)
+
+    def recommend_batch(
+        self,
+        model_name: str,
+        user_ids: tp.List[int],
+        k_recs: int,
+        histories: tp.Optional[tp.List[tp.Optional[tp.List[int]]]] = None,
+    ) -> tp.List[tp.List[int]]:
+        model = self.get_model(model_name)
+        if histories is None:
+            return model.recommend_batch(user_ids, k_recs)
+        return model.recommend_batch(user_ids, k_recs, histories)
 
 
+pipeline = MainPipeline()
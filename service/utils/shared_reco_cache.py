@@ -0,0 +1,225 @@
+import hashlib
+import time
+import typing as tp
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from service.utils.reco_cache import CacheKey
+
+MAGIC = 0x5245434F  # "RECO"
+HEADER_SIZE = 4
+N_GENERATIONS = 64
+WAYS = 4
+
+# columns of slot meta
+VERSION, CRC, MODEL, USER, K_RECS, LENGTH, EXPIRES, GENERATION = range(8)
+N_META = 8
+
+MIX = 0x9E3779B97F4A7C15
+MASK = 2 ** 64 - 1
+
+
+def _model_hash(model_name: str) -> int:
+    digest = hashlib.blake2b(model_name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def _crc(meta: np.ndarray, items: np.ndarray) -> int:
+    return zlib.crc32(items.tobytes(), zlib.crc32(meta[MODEL:].tobytes()))
+
+
+def _attach(name: str, size: int) -> shared_memory.SharedMemory:
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        shm = shared_memory.SharedMemory(name=name)
+    # segment outlives the worker that created it, see `unlink`
+    resource_tracker.unregister(shm._name, "shared_memory")  # noqa
+    return shm
+
+
+class SharedRecoCache:
+    """
+        Recommendation cache shared by all workers of a host:
+        fixed-size hash table of int32 item arrays in shared memory.
+        Key is looked up in `WAYS` neighbour slots, put replaces
+        the same key, a free or expired slot, or the oldest one.
+
+        Slots have no locks: writer makes slot version odd while
+        writing and readers check version and crc of the slot,
+        so a torn or concurrently replaced slot is just a miss.
+        Invalidation bumps generation of the model shared by workers.
+    """
+
+    def __init__(self, name: str, n_slots: int, max_k: int, ttl_s: float):
+        self.name = name
+        self.n_slots = n_slots
+        self.max_k = max_k
+        self.ttl_ns = int(ttl_s * 1e9)
+        self.hits = 0
+        self.misses = 0
+
+        sizes = [HEADER_SIZE, N_GENERATIONS, n_slots * N_META]
+        items_offset = 8 * sum(sizes)
+        size = items_offset + 4 * n_slots * max_k
+        self._shm = _attach(name, size)
+
+        int64 = np.ndarray(
+            (sum(sizes),), dtype=np.int64, buffer=self._shm.buf
+        )
+        header = int64[:HEADER_SIZE]
+        layout = [MAGIC, n_slots, max_k, N_GENERATIONS]
+        if header[0] == 0:
+            header[:] = layout
+        elif header.tolist() != layout:
+            raise ValueError(
+                f"Shared cache '{name}' has another layout {header.tolist()}"
+            )
+
+        self._generations = int64[HEADER_SIZE:HEADER_SIZE + N_GENERATIONS]
+        self._meta = int64[HEADER_SIZE + N_GENERATIONS:].reshape(
+            n_slots, N_META
+        )
+        self._items = np.ndarray(
+            (n_slots, max_k),
+            dtype=np.int32,
+            buffer=self._shm.buf,
+            offset=items_offset,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.n_slots > 0 and self.max_k > 0
+
+    def _slots(self, model: int, user_id: int, k_recs: int) -> tp.List[int]:
+        key_hash = ((model ^ (user_id * MIX) ^ k_recs) * MIX) & MASK
+        first = (key_hash >> 16) % self.n_slots
+        return [(first + way) % self.n_slots for way in range(WAYS)]
+
+    def _read(
+        self,
+        slot: int,
+    ) -> tp.Optional[tp.Tuple[np.ndarray, np.ndarray]]:
+        version = self._meta[slot, VERSION]
+        if version == 0 or version % 2:
+            return None
+
+        meta = self._meta[slot].copy()
+        length = min(max(meta[LENGTH], 0), self.max_k)
+        items = self._items[slot, :length].copy()
+        if self._meta[slot, VERSION] != version or meta[VERSION] != version:
+            return None
+        if _crc(meta, items) != meta[CRC]:
+            return None
+
+        return meta, items
+
+    def _generation(self, model: int) -> int:
+        return int(self._generations[model % N_GENERATIONS])
+
+    def get(self, key: CacheKey) -> tp.Optional[tp.List[int]]:
+        model_name, user_id, k_recs = key
+        model = _model_hash(model_name)
+        now = time.time_ns()
+        for slot in self._slots(model, user_id, k_recs):
+            entry = self._read(slot)
+            if entry is None:
+                continue
+
+            meta, items = entry
+            if (
+                meta[MODEL] == model
+                and meta[USER] == user_id
+                and meta[K_RECS] == k_recs
+                and meta[EXPIRES] > now
+                and meta[GENERATION] == self._generation(model)
+            ):
+                self.hits += 1
+                return items.tolist()
+
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, items: tp.List[int]) -> None:
+        if not self.enabled or len(items) > self.max_k:
+            return
+
+        model_name, user_id, k_recs = key
+        model = _model_hash(model_name)
+        now = time.time_ns()
+
+        slots = self._slots(model, user_id, k_recs)
+        slot = None
+        for candidate in slots:
+            meta = self._meta[candidate]
+            same_key = (
+                meta[MODEL] == model
+                and meta[USER] == user_id
+                and meta[K_RECS] == k_recs
+            )
+            if same_key or meta[EXPIRES] <= now:
+                slot = candidate
+                break
+        if slot is None:
+            slot = min(slots, key=lambda s: self._meta[s, EXPIRES])
+
+        entry = np.array(
+            [
+                0,
+                0,
+                model,
+                user_id,
+                k_recs,
+                len(items),
+                now + self.ttl_ns,
+                self._generation(model),
+            ],
+            dtype=np.int64,
+        )
+        values = np.asarray(items, dtype=np.int32)
+
+        meta = self._meta[slot]
+        version = meta[VERSION]
+        meta[VERSION] = version + 1 + version % 2
+        meta[MODEL:] = entry[MODEL:]
+        self._items[slot, :len(values)] = values
+        # crc of own entry, not of the slot: another worker
+        # may be writing the same slot at the moment
+        meta[CRC] = _crc(entry, values)
+        meta[VERSION] += 1
+
+    def invalidate(self, model_name: tp.Optional[str] = None) -> None:
+        """
+            Drops entries of the model in all workers,
+            all entries if model is None.
+        """
+        if model_name is None:
+            self._generations += 1
+        else:
+            self._generations[_model_hash(model_name) % N_GENERATIONS] += 1
+
+    def stats(self) -> tp.Dict[str, tp.Union[int, float]]:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "entries": int(
+                (self._meta[:, EXPIRES] > time.time_ns()).sum()
+            ),
+            "bytes": self._shm.size,
+        }
+
+    @staticmethod
+    def unlink(name: str) -> None:
+        """
+            Removes shared memory segment, e.g. on server exit.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return
+        shm.close()
+        shm.unlink()
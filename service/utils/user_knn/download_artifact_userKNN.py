@@ -1,50 +1,151 @@
+import os
 import typing as tp
+from functools import lru_cache
 
 import dill
 import numpy as np
 import pandas as pd
 import yaml
 
+from service.utils.artifact_store import as_ids
+from service.utils.common_artifact import store
+from service.utils.csr import build_csr
+from service.utils.id_mapping import IdMapping
+from service.utils.offline_index import OfflineRecoIndex
+from service.utils.user_knn.history_neighbours import HistoryNeighbours
+from service.utils.user_knn.neighbours import (
+    NeighbourMatrix,
+    get_neighbours_path,
+)
+
+NO_IDF_RANK = np.iinfo(np.int32).max
+
+
+WATCHED_ARRAYS = (
+    "user_knn_users",
+    "user_knn_watched_indptr",
+    "user_knn_watched_indices",
+)
+ITEM_IDF_RANK_ARRAY = "user_knn_item_idf_rank"
+DEFAULT_MAX_HISTORY = 100
+
+
+def build_watched(path_interactions_data: str) -> tp.Dict[str, np.ndarray]:
+    """
+        Items watched by user index as CSR in watched order,
+        users are ordered by first appearance.
+    """
+    interactions = pd.read_csv(
+        path_interactions_data, usecols=['user_id', 'item_id']
+    )
+    users_idx, users = pd.factorize(interactions['user_id'])
+    watched_indptr, watched_indices = build_csr(
+        users_idx, interactions['item_id'].values, len(users)
+    )
+
+    return dict(zip(
+        WATCHED_ARRAYS, (as_ids(users.values), watched_indptr, watched_indices)
+    ))
+
+
+def build_item_idf_rank(path_item_idf: str) -> np.ndarray:
+    """
+        Position of every item id in idf order,
+        items without idf get NO_IDF_RANK.
+    """
+    item_idf = pd.read_csv(path_item_idf)["index"].values
+    item_idf_rank = np.full(item_idf.max() + 1, NO_IDF_RANK, np.int32)
+    item_idf_rank[item_idf] = np.arange(len(item_idf), dtype=np.int32)
+
+    return item_idf_rank
+
+
+@lru_cache(maxsize=2)
+def _read_watched(path_interactions_data: str, mtime: float) -> tp.Dict:
+    """
+        Interactions are shared by all userKNN variants of the process,
+        `mtime` of the file is a part of the key, so a reload reads
+        a new file. Arrays are memory-mapped from the artifact store
+        when they are compiled.
+    """
+    if store.exists(*WATCHED_ARRAYS, sources=[path_interactions_data]):
+        arrays = {name: store.load(name) for name in WATCHED_ARRAYS}
+        users_mapping = IdMapping.load(store, "user_knn_users")
+    else:
+        arrays = build_watched(path_interactions_data)
+        users_mapping = IdMapping(arrays["user_knn_users"])
+
+    return {
+        "watched_indptr": arrays["user_knn_watched_indptr"],
+        "watched_indices": arrays["user_knn_watched_indices"],
+        "users_mapping": users_mapping,
+        "history_neighbours": HistoryNeighbours(
+            arrays["user_knn_watched_indptr"],
+            arrays["user_knn_watched_indices"],
+        ),
+    }
+
+
+@lru_cache(maxsize=8)
+def _read_model(path_model: str, mtime: float) -> NeighbourMatrix:
+    """
+        Neighbours are shared by all userKNN variants of the process,
+        `mtime` of the file is a part of the key as for `_read_watched`.
+        Exported neighbours are memory-mapped, otherwise they are
+        taken from dill model.
+    """
+    path_neighbours = get_neighbours_path(path_model)
+    if (
+        os.path.isdir(path_neighbours)
+        and os.path.getmtime(path_neighbours) >= mtime
+    ):
+        return NeighbourMatrix.load(path_neighbours)
+
+    with open(path_model, "rb") as file:
+        model = dill.load(file)
+
+    return NeighbourMatrix.from_model(model)
+
 
 class DownloadArtifact:
     config_path = './service/config/inference-userKNN.cfg.yml'
     path_interactions_data = './data/kion_train/interactions.csv'
     path_item_idf = "./data/kion_train/items_idf.csv"
 
-    def __init__(self):
+    def __init__(self, config_path: tp.Optional[str] = None):
+        if config_path is None:
+            config_path = self.config_path
 
-        with open(self.config_path) as models_config:
+        with open(config_path) as models_config:
             params = yaml.safe_load(models_config)
 
         self.run_params = params["run_params"]
 
     def _get_online_reco_artifact(self) -> tp.Dict:
-        interactions = pd.read_csv(self.path_interactions_data)
-        watched = interactions.groupby('user_id').agg(
-            {'item_id': list}
-        ).to_dict()["item_id"]
-        users_inv_mapping = dict(enumerate(interactions['user_id'].unique()))
-        users_mapping = {v: k for k, v in users_inv_mapping.items()}
         index_bmp_model = self.run_params["artifact"]["index_bmp_model"]
 
         return {
-            "watched": watched,
-            "users_inv_mapping": users_inv_mapping,
-            "users_mapping": users_mapping,
+            **_read_watched(
+                self.path_interactions_data,
+                os.path.getmtime(self.path_interactions_data),
+            ),
             "index_bmp_model": index_bmp_model,
+            "max_history": self.run_params.get("cold_start", {}).get(
+                "max_history", DEFAULT_MAX_HISTORY
+            ),
         }
 
-    def _get_item_idf(self) -> np.array:
-        return pd.read_csv(self.path_item_idf)["index"].values
+    def _get_item_idf_rank(self) -> np.array:
+        if store.exists(ITEM_IDF_RANK_ARRAY, sources=[self.path_item_idf]):
+            return store.load(ITEM_IDF_RANK_ARRAY)
+
+        return build_item_idf_rank(self.path_item_idf)
 
     def _get_one_model(self, path_model: str = None):
         if path_model is None:
             path_model = self.run_params["artifact"]["model_path_1"]
 
-        with open(path_model, "rb") as file:
-            model = dill.load(file)
-
-        return model
+        return _read_model(path_model, os.path.getmtime(path_model))
 
     def _get_several_model(self, k_model: int = 2) -> tp.List:
         models = list()
@@ -66,9 +167,11 @@ class DownloadArtifact:
         return self.run_params["artifact"]["blending"]
 
     def get_offline_artifact(self):
+        artifact = self.run_params["artifact"]
         return {
-            "offline_reco": pd.read_csv(
-                self.run_params["artifact"]["offline_reco_path"]
+            "offline_reco": OfflineRecoIndex.load_or_build(
+                path_index=artifact.get("offline_index_path"),
+                path_csv=artifact["offline_reco_path"],
             )
         }
 
@@ -79,9 +182,11 @@ class DownloadArtifact:
                       ] != -1 else False
         return {
             "model": self._get_one_model(),
-            "watched": online_artifact["watched"],
+            "watched_indptr": online_artifact["watched_indptr"],
+            "watched_indices": online_artifact["watched_indices"],
             "users_mapping": online_artifact["users_mapping"],
-            "users_inv_mapping": online_artifact["users_inv_mapping"],
+            "history_neighbours": online_artifact["history_neighbours"],
+            "max_history": online_artifact["max_history"],
             "bmp": bmp,
         }
 
@@ -89,22 +194,28 @@ class DownloadArtifact:
         online_artifact = self._get_online_reco_artifact()
 
         models = self._get_several_model()
-        bmp = True if online_artifact[
-                          "index_bmp_model"
-                      ] != -1 else False
+        index_bmp_model = online_artifact["index_bmp_model"]
+        if index_bmp_model not in (1, 2):
+            raise ValueError(
+                f"Blending needs index_bmp_model 1 or 2, got {index_bmp_model}"
+            )
 
-        if bmp == 1:
-            model_bmp = models[0]
-            model_tfidf = models[1]
-        else:
-            model_bmp = models[1]
-            model_tfidf = models[0]
+        model_bmp = models[index_bmp_model - 1]
+        model_tfidf = models[2 - index_bmp_model]
 
         return {
             "model_tfidf": model_tfidf,
             "model_bmp": model_bmp,
-            "item_idf": self._get_item_idf(),
-            "watched": online_artifact["watched"],
+            "item_idf_rank": self._get_item_idf_rank(),
+            "blending_type": self.run_params["artifact"].get(
+                "blending_type", "idf"
+            ),
+            "blending_weights": self.run_params["artifact"].get(
+                "blending_weights", [0.5, 0.5]
+            ),
+            "watched_indptr": online_artifact["watched_indptr"],
+            "watched_indices": online_artifact["watched_indices"],
             "users_mapping": online_artifact["users_mapping"],
-            "users_inv_mapping": online_artifact["users_inv_mapping"],
+            "history_neighbours": online_artifact["history_neighbours"],
+            "max_history": online_artifact["max_history"],
         }
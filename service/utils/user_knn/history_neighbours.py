@@ -0,0 +1,91 @@
+import threading
+import typing as tp
+
+import numpy as np
+
+from service.utils.csr import build_csr
+
+
+class HistoryNeighbours:
+    """
+        Similar users of a user outside of the model from its history.
+        Users are binary item vectors weighted by item idf, similarity
+        is cosine of them. Only users who watched an item of history
+        are scored, they are found in CSR of item -> users.
+        The CSR is built on the first request with history, so
+        processes never getting one keep only the watched arrays.
+    """
+
+    def __init__(
+        self,
+        watched_indptr: np.ndarray,
+        watched_indices: np.ndarray,
+    ):
+        self.watched_indptr = watched_indptr
+        self.watched_indices = watched_indices
+        self._lock = threading.Lock()
+        self._built = False
+
+    def _build(self) -> None:
+        with self._lock:
+            if self._built:
+                return
+
+            n_users = len(self.watched_indptr) - 1
+            rows = np.repeat(
+                np.arange(n_users, dtype=np.int32),
+                np.diff(self.watched_indptr),
+            )
+            self.items, items_idx = np.unique(
+                self.watched_indices, return_inverse=True
+            )
+            self.item_indptr, self.item_users = build_csr(
+                items_idx, rows, len(self.items)
+            )
+            self.idf = np.log(
+                n_users / np.diff(self.item_indptr)
+            ).astype(np.float32)
+            weights = self.idf[items_idx].astype(np.float64) ** 2
+            self.user_norms = np.sqrt(
+                np.bincount(rows, weights=weights, minlength=n_users)
+            ).astype(np.float32)
+            self._built = True
+
+    def get_neighbours(
+        self,
+        history: tp.Iterable[int],
+        k: int,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+            Top k users (indices, scores) ordered by score,
+            ties by user index.
+        """
+        if not self._built:
+            self._build()
+
+        history = np.unique(np.asarray(history, dtype=np.int64))
+        if not len(history) or not len(self.items):
+            return np.array([], dtype=np.int32), np.array([], np.float32)
+
+        pos = np.searchsorted(self.items, history)
+        pos[pos == len(self.items)] = 0
+        items_idx = pos[self.items[pos] == history]
+        if not len(items_idx):
+            return np.array([], dtype=np.int32), np.array([], np.float32)
+
+        starts = self.item_indptr[items_idx]
+        lengths = self.item_indptr[items_idx + 1] - starts
+        positions = np.arange(lengths.sum()) + np.repeat(
+            starts - (np.cumsum(lengths) - lengths), lengths
+        )
+        users, inverse = np.unique(
+            self.item_users[positions], return_inverse=True
+        )
+        weights = np.repeat(self.idf[items_idx] ** 2, lengths)
+        history_norm = np.sqrt((self.idf[items_idx] ** 2).sum())
+        scores = np.bincount(inverse, weights=weights) / np.maximum(
+            history_norm * self.user_norms[users], 1e-9
+        )
+
+        top = np.lexsort((users, -scores))[:k]
+        return users[top], scores[top].astype(np.float32)
@@ -0,0 +1,173 @@
+"""
+    Exports userKNN similarity to pruned neighbour lists.
+
+    Usage: python -m service.utils.user_knn.neighbours \
+        --model ./service/weights/userKNN/tfidf-k60-implicit.dill \
+        --neighbours 100
+"""
+import argparse
+import os
+import typing as tp
+
+import dill
+import numpy as np
+
+from service.utils.artifact_store import (
+    load_array_dir,
+    load_meta,
+    save_array_dir,
+)
+
+NEIGHBOURS_SUFFIX = ".knn"
+DEFAULT_NEIGHBOURS = 100
+BELOW_ONE = np.nextafter(np.float32(1), np.float32(0))
+
+
+class NeighbourMatrix:
+    """
+        CSR of similar users: neighbours of user i are
+        indices[indptr[i]:indptr[i + 1]] (int32) with scores (float32),
+        ordered by score, ties by neighbour index.
+    """
+
+    files = ("indptr", "indices", "scores")
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        meta: tp.Optional[tp.Dict] = None,
+    ):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.meta = meta or {}
+
+    @classmethod
+    def from_model(
+        cls,
+        model,
+        n_neighbours: tp.Optional[int] = None,
+    ) -> "NeighbourMatrix":
+        """
+            Sorts rows of similarity of implicit model (or of fitted
+            UserKnn) and keeps top `n_neighbours` of every row.
+        """
+        model = getattr(model, "user_knn", model)
+        similarity = model.similarity.tocsr()
+        similarity.sort_indices()
+
+        lengths = np.diff(similarity.indptr)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        order = np.lexsort((-similarity.data, rows))
+        keep = np.ones(len(order), dtype=bool)
+        if n_neighbours is not None:
+            rank = np.arange(len(order)) - similarity.indptr[rows]
+            keep = rank < n_neighbours
+            lengths = np.minimum(lengths, n_neighbours)
+
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        data = similarity.data[order][keep]
+        scores = data.astype(np.float32)
+        # keep `score < 1` as it was before rounding, self similarity of
+        # tfidf is often 1 - eps and filtering relies on it
+        scores[(data < 1) & (scores >= 1)] = BELOW_ONE
+        meta = {
+            "n_users": int(similarity.shape[0]),
+            "n_neighbours": n_neighbours,
+        }
+        return cls(
+            indptr,
+            similarity.indices[order][keep].astype(np.int32),
+            scores,
+            meta,
+        )
+
+    def save(self, path: str, replace: bool = False) -> None:
+        save_array_dir(
+            path,
+            {name: getattr(self, name) for name in self.files},
+            replace=replace,
+            meta=self.meta,
+        )
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        mmap_mode: tp.Optional[str] = "r",
+    ) -> "NeighbourMatrix":
+        return cls(
+            *load_array_dir(path, cls.files, mmap_mode), meta=load_meta(path)
+        )
+
+    def get_rows(
+        self,
+        rows: np.ndarray,
+        k: int,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+            Top k neighbours of rows as flat arrays:
+            row position, neighbour index, score and row bounds.
+            Rows pruned on export cannot give more neighbours
+            than they keep, such k raises ValueError.
+        """
+        n_neighbours = self.meta.get("n_neighbours")
+        if n_neighbours is not None and k > n_neighbours:
+            raise ValueError(
+                f"{k} neighbours requested, rows are pruned to "
+                f"{n_neighbours}, export them with more neighbours"
+            )
+
+        starts = self.indptr[rows]
+        lengths = np.minimum(self.indptr[rows + 1] - starts, k)
+        bounds = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=bounds[1:])
+
+        positions = np.arange(bounds[-1]) + np.repeat(
+            starts - bounds[:-1], lengths
+        )
+        return (
+            np.repeat(np.arange(len(rows)), lengths),
+            self.indices[positions],
+            self.scores[positions],
+            bounds,
+        )
+
+
+def get_neighbours_path(path_model: str) -> str:
+    return path_model + NEIGHBOURS_SUFFIX
+
+
+def export_neighbours(
+    path_model: str,
+    n_neighbours: int = DEFAULT_NEIGHBOURS,
+) -> str:
+    """
+        Exports dill model next to it, returns path of neighbours.
+    """
+    with open(path_model, "rb") as file:
+        model = dill.load(file)
+
+    neighbours = NeighbourMatrix.from_model(model, n_neighbours)
+    neighbours.meta["source"] = os.path.basename(path_model)
+
+    path = get_neighbours_path(path_model)
+    neighbours.save(path, replace=True)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", action="append", required=True)
+    parser.add_argument("--neighbours", type=int, default=DEFAULT_NEIGHBOURS)
+    args = parser.parse_args()
+
+    for path_model in args.model:
+        print(export_neighbours(path_model, args.neighbours))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,20 @@
 import typing as tp
 
-import implicit
 import numpy as np
-import pandas as pd
 
-from service.utils.user_knn.download_artifact_userKNN import DownloadArtifact
+from service.utils.id_mapping import UNKNOWN
+from service.utils.user_knn.download_artifact_userKNN import (
+    NO_IDF_RANK,
+    DownloadArtifact,
+)
+from service.utils.user_knn.neighbours import NeighbourMatrix
 
 
 class RecommendUserKNN:
 
-    def __init__(self):
+    def __init__(self, config_path: tp.Optional[str] = None):
 
-        loader = DownloadArtifact()
+        loader = DownloadArtifact(config_path)
 
         self.type_reco = loader.get_type_reco()
 
@@ -28,139 +31,232 @@ class RecommendUserKNN:
                 self.artifact = loader.get_online_blending_artifact()
 
     @staticmethod
-    def _get_sim_user(
-        user: int,
+    def _get_sim_users(
+        users_idx: np.ndarray,
         k_recs: int,
-        model: implicit,
-        users_mapping: tp.Dict[int, int],
-        users_inv_mapping: tp.Dict[int, int],
+        model: NeighbourMatrix,
         bmp: bool,
-    ) -> pd.DataFrame:
+    ) -> tp.List[tp.Tuple[np.ndarray, np.ndarray]]:
         """
-            The function find similar users.
+            The function find similar users (indices, scores)
+            for several users. It slices top of the sorted neighbour
+            rows, the same users `similar_items` returns.
         """
-        user_id = users_mapping[user]
-        recs = model.similar_items(user_id, N=k_recs)
-
+        rows, neighbours, scores, _ = model.get_rows(users_idx, k_recs)
         if bmp:
-            recs = list(
-                filter(lambda x: x[0] != users_inv_mapping[user_id], recs))
-
+            mask = neighbours != users_idx[rows]
         else:
-            recs = list(filter(lambda x: x[1] < 1, recs))
+            mask = scores < 1
 
-        return [users_inv_mapping[user] for user, _ in recs]
+        bounds = np.searchsorted(rows[mask], np.arange(len(users_idx) + 1))
+        neighbours = neighbours[mask]
+        scores = scores[mask]
+        return [
+            (neighbours[start:stop], scores[start:stop])
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
 
-    def _get_offline_reco(
+    def _get_watched_items(
         self,
-        user_id: int,
+        sim_users_idx: np.ndarray,
+        sim_scores: np.ndarray,
         k_recs: int,
-    ) -> tp.List[int]:
+        blending: bool = False,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
         """
-            The function creates offline recommendation.
+            The function collects unique items watched by similar users,
+            in order of similar users and of their history.
+            Item score is the similarity of the first user who watched it.
         """
-        offline_reco = self.artifact["offline_reco"]
+        indptr = self.artifact["watched_indptr"]
+        starts = indptr[sim_users_idx]
+        lengths = indptr[sim_users_idx + 1] - starts
 
-        recs = list()
-        if user_id in ['user_id']:
-            recs = offline_reco[
-                offline_reco['user_id'] == user_id
-                ]['item_id'].tolist()
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) + np.repeat(
+            starts - offsets, lengths
+        )
+        recs = self.artifact["watched_indices"][positions]
+        first = np.sort(np.unique(recs, return_index=True)[1])
+        recs = recs[first]
+        scores = np.repeat(sim_scores, lengths)[first]
 
-            if len(recs) > k_recs:
-                recs = recs[:k_recs]
+        if not blending:
+            recs, scores = recs[:k_recs], scores[:k_recs]
 
-        return recs
+        return recs, scores
 
     def _get_online_reco(
         self,
-        user_id: int,
+        users_idx: np.ndarray,
         k_recs: int,
-        model: implicit = None,
+        model: NeighbourMatrix = None,
         bmp=None,
         blending: bool = False,
-    ) -> tp.List[int]:
+    ) -> tp.List[tp.Tuple[np.ndarray, np.ndarray]]:
         """
-            The function creates online recommendation.
+            The function creates online recommendation (items, scores)
+            for known users.
         """
-        recs = list()
-        if user_id in self.artifact["users_mapping"]:
-            if bmp is None:
-                bmp = self.artifact["bmp"]
-            if model is None:
-                model = self.artifact["model"]
+        if bmp is None:
+            bmp = self.artifact["bmp"]
+        if model is None:
+            model = self.artifact["model"]
 
-            sim_user_id = self._get_sim_user(
-                user_id,
-                k_recs,
-                model=model,
-                users_mapping=self.artifact["users_mapping"],
-                users_inv_mapping=self.artifact["users_inv_mapping"],
-                bmp=bmp
-            )
+        sim_users = self._get_sim_users(users_idx, k_recs, model, bmp)
 
-            recs = np.array(
-                [item for user in sim_user_id for item in
-                 self.artifact["watched"][user]]
+        return [
+            self._get_watched_items(
+                sim_users_idx, sim_scores, k_recs, blending
             )
-            recs = recs[
-                np.sort(np.unique(recs, return_index=True)[1])].tolist()
+            for sim_users_idx, sim_scores in sim_users
+        ]
 
-            if (len(recs) > k_recs) and (not blending):
-                recs = recs[:k_recs]
+    def _get_blending_models(self) -> tp.List[tp.Tuple[NeighbourMatrix, bool]]:
+        """
+            The function returns (model, bmp) pairs used for blending.
+        """
+        return [
+            (self.artifact["model_tfidf"], False),
+            (self.artifact["model_bmp"], True),
+        ]
 
-        return recs
+    def _blend(
+        self,
+        recs_tfidf: tp.Tuple[np.ndarray, np.ndarray],
+        recs_bmp: tp.Tuple[np.ndarray, np.ndarray],
+        k_recs: int,
+    ) -> np.ndarray:
+        """
+            The function blends recommendations of two models.
+            'idf': union of items ordered by item idf.
+            'weighted': items ordered by weighted sum of model scores,
+            each normalized by its max, ties are ordered by item idf.
+        """
+        items = np.concatenate((recs_tfidf[0], recs_bmp[0]))
+        if self.artifact["blending_type"] == "weighted":
+            scores = np.concatenate([
+                weight * scores / max(scores.max(initial=0), 1e-9)
+                for (_, scores), weight in zip(
+                    (recs_tfidf, recs_bmp), self.artifact["blending_weights"]
+                )
+            ])
+            items, inverse = np.unique(items, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        else:
+            items = np.unique(items)
+            scores = np.zeros(len(items))
+
+        item_idf_rank = self.artifact["item_idf_rank"]
+        rank = np.full(len(items), NO_IDF_RANK, dtype=np.int32)
+        in_range = items < len(item_idf_rank)
+        rank[in_range] = item_idf_rank[items[in_range]]
+        if self.artifact["blending_type"] != "weighted":
+            has_idf = rank != NO_IDF_RANK
+            items, rank = items[has_idf], rank[has_idf]
+            scores = scores[has_idf]
+
+        return items[np.lexsort((rank, -scores))][:k_recs]
 
     def _get_online_blending_reco(
         self,
-        user_id: int,
+        users_idx: np.ndarray,
         k_recs: int,
-    ) -> tp.List[int]:
+    ) -> tp.List[np.ndarray]:
         """
             The function creates online recommendation
             with blending by tfidf algorithm.
         """
-        recs = list()
-        if user_id in self.artifact["users_mapping"]:
-
-            recs_tfidf = self._get_online_reco(
-                user_id=user_id,
-                k_recs=k_recs,
-                model=self.artifact["model_tfidf"],
-                bmp=False,
-                blending=True,
-            )
-
-            recs_bmp = self._get_online_reco(
-                user_id=user_id,
-                k_recs=k_recs,
-                model=self.artifact["model_tfidf"],
-                bmp=True,
+        recs_tfidf, recs_bmp = [
+            self._get_online_reco(
+                users_idx,
+                k_recs,
+                model=model,
+                bmp=bmp,
                 blending=True,
             )
+            for model, bmp in self._get_blending_models()
+        ]
 
-            recs = np.unique(
-                np.concatenate(
-                    (recs_tfidf, recs_bmp)
-                )
-            )
-
-            item_idf = self.artifact["item_idf"]
-            mask = np.in1d(item_idf, recs)
-            recs = item_idf[mask].tolist()
+        return [
+            self._blend(user_tfidf, user_bmp, k_recs)
+            for user_tfidf, user_bmp in zip(recs_tfidf, recs_bmp)
+        ]
 
-            if len(recs) > k_recs:
-                recs = recs[:k_recs]
+    def _get_cold_reco(
+        self,
+        history: tp.List[int],
+        k_recs: int,
+    ) -> np.ndarray:
+        """
+            The function creates online recommendation for a user
+            outside of the model, similar users are found by history.
+            Items of history are not recommended.
+        """
+        history = history[-self.artifact["max_history"]:]
+        sim_users_idx, sim_scores = self.artifact[
+            "history_neighbours"
+        ].get_neighbours(history, k_recs)
+        recs, scores = self._get_watched_items(
+            sim_users_idx, sim_scores, k_recs, blending=True
+        )
+        unseen = ~np.isin(recs, history)
+        recs, scores = recs[unseen], scores[unseen]
+
+        if self.blending:
+            return self._blend((recs, scores), (recs, scores), k_recs)
+        return recs[:k_recs]
+
+    def uses_history(self, user_id: int) -> bool:
+        """
+            Whether history of the user is used: online models
+            score users outside of the model by history.
+        """
+        if self.type_reco == "offline":
+            return False
+        return user_id not in self.artifact["users_mapping"]
 
-        return recs
+    def recommend(
+        self,
+        user_id: int,
+        k_recs: int,
+        history: tp.Optional[tp.List[int]] = None,
+    ) -> tp.List[int]:
+        histories = None if history is None else [history]
+        return self.recommend_batch([user_id], k_recs, histories)[0]
 
-    def recommend(self, user_id: int, k_recs: int) -> tp.List[int]:
+    def recommend_batch(
+        self,
+        user_ids: tp.List[int],
+        k_recs: int,
+        histories: tp.Optional[tp.List[tp.Optional[tp.List[int]]]] = None,
+    ) -> tp.List[tp.List[int]]:
         if self.type_reco == "offline":
-            return self._get_offline_reco(user_id, k_recs)
+            return self.artifact["offline_reco"].get_batch(user_ids, k_recs)
 
-        else:
+        recs: tp.List[tp.List[int]] = [[] for _ in user_ids]
+        users_idx = self.artifact["users_mapping"].to_inner(user_ids)
+        positions = np.flatnonzero(users_idx != UNKNOWN)
+        if len(positions):
+            known_idx = users_idx[positions]
             if not self.blending:
-                return self._get_online_reco(user_id, k_recs)
-
+                known_recs = [
+                    user_recs
+                    for user_recs, _ in self._get_online_reco(
+                        known_idx, k_recs
+                    )
+                ]
             else:
-                return self._get_online_blending_reco(user_id, k_recs)
+                known_recs = self._get_online_blending_reco(known_idx, k_recs)
+
+            for pos, user_recs in zip(positions, known_recs):
+                recs[pos] = user_recs.tolist()
+
+        if histories is not None:
+            for pos in np.flatnonzero(users_idx == UNKNOWN):
+                if histories[pos]:
+                    recs[pos] = self._get_cold_reco(
+                        histories[pos], k_recs
+                    ).tolist()
+
+        return recs
@@ -1,11 +1,15 @@
+import typing as tp
 from collections import Counter
-from typing import Dict
 
 import numpy as np
 import pandas as pd
 import scipy as sp
 from implicit.nearest_neighbours import ItemItemRecommender
 
+from service.utils.csr import build_csr
+from service.utils.id_mapping import UNKNOWN, IdMapping
+from service.utils.user_knn.neighbours import NeighbourMatrix
+
 
 class UserKnn:
     """Class for fit-perdict UserKNN model
@@ -24,11 +28,8 @@ class UserKnn:
         self.is_fitted = False
 
     def get_mappings(self, train):
-        self.users_inv_mapping = dict(enumerate(train['user_id'].unique()))
-        self.users_mapping = {v: k for k, v in self.users_inv_mapping.items()}
-
-        self.items_inv_mapping = dict(enumerate(train['item_id'].unique()))
-        self.items_mapping = {v: k for k, v in self.items_inv_mapping.items()}
+        self.users_mapping = IdMapping(train['user_id'].unique())
+        self.items_mapping = IdMapping(train['item_id'].unique())
 
     def get_matrix(
         self,
@@ -46,12 +47,16 @@ class UserKnn:
         interaction_matrix = sp.sparse.coo_matrix((
             weights,
             (
-                df[user_col].map(self.users_mapping.get),
-                df[item_col].map(self.items_mapping.get)
+                self.users_mapping.to_inner(df[user_col].values),
+                self.items_mapping.to_inner(df[item_col].values)
             )
         ))
 
-        self.watched = df.groupby(user_col).agg({item_col: list})
+        self.watched_indptr, self.watched_indices = build_csr(
+            self.users_mapping.to_inner(df[user_col].values),
+            df[item_col].values,
+            len(self.users_mapping),
+        )
         return interaction_matrix
 
     def idf(self, n: int, x: float):
@@ -77,58 +82,135 @@ class UserKnn:
         self.user_knn.fit(self.weights_matrix)
         self.is_fitted = True
 
-    def _generate_recs_mapper(self, user_mapping: Dict[int, int],
-                              user_inv_mapping: Dict[int, int], N: int):
-        def _recs_mapper(user):
-            user_id = user_mapping[user]
-            recs = self.user_knn.similar_items(user_id, N=N)
-            return (
-                [user_inv_mapping[user] for user, _ in recs],
-                [sim for _, sim in recs]
-            )
-        return _recs_mapper
+    def _get_item_weights(self) -> np.ndarray:
+        """
+            Item idf by item id, NaN for items without idf.
+        """
+        item_ids = self.item_idf['index'].values
+        weights = np.full(item_ids.max() + 1, np.nan)
+        weights[item_ids] = self.item_idf['idf'].values
+        return weights
 
-    def predict(
+    def _predict_chunk(
         self,
-        test: pd.DataFrame,
+        neighbours: NeighbourMatrix,
+        users_idx: np.ndarray,
+        N_recs: int,
+        bmp25: bool,
+        item_weights: tp.Optional[np.ndarray],
+    ) -> pd.DataFrame:
+        """
+            Items of similar users of chunk of users. Item score is
+            the similarity of the most similar user who watched it
+            (times item idf), items are ranked by score.
+        """
+        rows, sim_users, sims, bounds = neighbours.get_rows(
+            users_idx, self.N_users
+        )
+        if bmp25:
+            keep = np.arange(len(rows)) != bounds[rows]
+        else:
+            keep = sims < 1
+        rows, sim_users, sims = rows[keep], sim_users[keep], sims[keep]
+
+        starts = self.watched_indptr[sim_users]
+        lengths = self.watched_indptr[sim_users + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) + np.repeat(
+            starts - offsets, lengths
+        )
+        items = self.watched_indices[positions]
+        rows = np.repeat(rows, lengths)
+        sims = np.repeat(sims, lengths)
+
+        # first (most similar) user who watched the item, stable on ties
+        order = np.lexsort((-sims, items, rows))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (np.diff(rows[order]) != 0) | (
+            np.diff(items[order]) != 0
+        )
+        order = np.sort(order[first])
+        rows, items, sims = rows[order], items[order], sims[order]
+
+        scores = sims
+        if item_weights is not None:
+            scores = sims * item_weights[items]
+
+        order = np.lexsort((-sims, -scores, rows))
+        rows, items, scores = rows[order], items[order], scores[order]
+        row_starts = np.searchsorted(rows, np.arange(len(users_idx)))
+        rank = np.arange(len(rows)) - row_starts[rows] + 1
+        top = rank <= N_recs
+
+        return pd.DataFrame({
+            'user_id': self.users_mapping.to_external(
+                users_idx[rows[top]]
+            ),
+            'item_id': items[top],
+            'score': scores[top],
+            'rank': rank[top],
+        })
+
+    def predict_batches(
+        self,
+        user_ids: tp.Iterable[int],
         N_recs: int = 10,
-        bmp25: bool = False
-    ):
-
+        bmp25: bool = False,
+        chunk_size: int = 10000,
+    ) -> tp.Iterator[pd.DataFrame]:
+        """
+            Recommendations of users chunk by chunk, so peak memory
+            is bounded by chunk size. Unknown users are skipped.
+        """
         if not self.is_fitted:
             raise ValueError("Please call fit before predict")
 
-        mapper = self._generate_recs_mapper(
-            user_mapping=self.users_mapping,
-            user_inv_mapping=self.users_inv_mapping,
-            N=self.N_users
+        neighbours = NeighbourMatrix.from_model(
+            self.user_knn, n_neighbours=self.N_users
         )
+        item_weights = None
+        if self.use_weight_idf:
+            item_weights = self._get_item_weights()
 
-        recs = pd.DataFrame({'user_id': test['user_id'].unique()})
-        recs['sim_user_id'], recs['sim'] = zip(*recs['user_id'].map(mapper))
-        recs = recs.set_index('user_id').apply(pd.Series.explode).reset_index()
-
-        if not bmp25:
-            recs = recs[~(recs['sim'] >= 1)]
-        else:
-            recs['rank'] = recs.groupby('user_id').cumcount()
-            recs = recs[recs['rank'] != 0]
-            del recs['rank']
-
-        recs = recs.merge(self.watched, left_on=['sim_user_id'],
-                          right_on=['user_id'], how='left') \
-            .explode('item_id') \
-            .sort_values(['user_id', 'sim'], ascending=False) \
-            .drop_duplicates(['user_id', 'item_id'], keep='first')
+        users_idx = self.users_mapping.to_inner(
+            pd.unique(np.asarray(user_ids))
+        )
+        users_idx = users_idx[users_idx != UNKNOWN]
+        for start in range(0, len(users_idx), chunk_size):
+            yield self._predict_chunk(
+                neighbours,
+                users_idx[start:start + chunk_size],
+                N_recs,
+                bmp25,
+                item_weights,
+            )
 
-        if self.use_weight_idf:
-            recs = recs.merge(self.item_idf, left_on='item_id',
-                              right_on='index', how='left')
-            recs['score'] = recs['sim'] * recs['idf']
-            recs = recs.sort_values(['user_id', 'score'], ascending=False)
-        else:
-            recs.rename(columns={'sim': 'score'}, inplace=True)
+    def predict(
+        self,
+        test: pd.DataFrame,
+        N_recs: int = 10,
+        bmp25: bool = False,
+        chunk_size: int = 10000,
+    ) -> pd.DataFrame:
+        return pd.concat(
+            self.predict_batches(
+                test['user_id'].values, N_recs, bmp25, chunk_size
+            ),
+            ignore_index=True,
+        )
 
-        recs['rank'] = recs.groupby('user_id').cumcount() + 1
-        return recs[recs['rank'] <= N_recs][
-            ['user_id', 'item_id', 'score', 'rank']]
+    def predict_to_csv(
+        self,
+        path: str,
+        user_ids: tp.Iterable[int],
+        N_recs: int = 10,
+        bmp25: bool = False,
+        chunk_size: int = 10000,
+    ) -> None:
+        """
+            Writes recommendations to csv chunk by chunk.
+        """
+        batches = self.predict_batches(user_ids, N_recs, bmp25, chunk_size)
+        for number, batch in enumerate(batches):
+            batch.to_csv(path, mode='a' if number else 'w',
+                         header=not number, index=False)
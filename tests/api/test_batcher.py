@@ -0,0 +1,73 @@
+import asyncio
+import typing as tp
+from concurrent.futures.thread import ThreadPoolExecutor
+
+from service.api.batcher import MicroBatcher
+from service.api.executor import InferenceExecutor
+
+
+def _make_batcher(
+    calls: tp.List[tp.List[int]],
+    max_users: int,
+) -> MicroBatcher:
+    def recommend_batch(
+        model_name: str,
+        user_ids: tp.List[int],
+        k_recs: int,
+    ) -> tp.List[tp.List[int]]:
+        calls.append(user_ids)
+        return [[user_id] * k_recs for user_id in user_ids]
+
+    inference = InferenceExecutor(
+        ThreadPoolExecutor(max_workers=1), max_workers=1, max_queue=8
+    )
+    return MicroBatcher(
+        inference, recommend_batch, max_users=max_users, max_wait_ms=50
+    )
+
+
+def test_batcher_groups_concurrent_requests() -> None:
+    calls: tp.List[tp.List[int]] = []
+    batcher = _make_batcher(calls, max_users=3)
+
+    async def run() -> tp.List[tp.List[int]]:
+        return await asyncio.gather(*[
+            batcher.recommend("model", user_id, k_recs=2)
+            for user_id in [1, 2, 3, 4]
+        ])
+
+    assert asyncio.run(run()) == [[1, 1], [2, 2], [3, 3], [4, 4]]
+    assert calls == [[1, 2, 3], [4]]
+
+
+def test_batcher_keeps_models_apart() -> None:
+    calls: tp.List[tp.List[int]] = []
+    batcher = _make_batcher(calls, max_users=10)
+
+    async def run() -> tp.List[tp.List[int]]:
+        return await asyncio.gather(
+            batcher.recommend("model_1", 1, k_recs=1),
+            batcher.recommend("model_2", 2, k_recs=1),
+            batcher.recommend("model_1", 3, k_recs=1),
+        )
+
+    assert asyncio.run(run()) == [[1], [2], [3]]
+    assert sorted(calls) == [[1, 3], [2]]
+
+
+def test_batcher_close_runs_waiting_requests() -> None:
+    calls: tp.List[tp.List[int]] = []
+    batcher = _make_batcher(calls, max_users=10)
+
+    async def run() -> tp.List[int]:
+        request = asyncio.ensure_future(
+            batcher.recommend("model", 1, k_recs=1)
+        )
+        await asyncio.sleep(0)
+        assert batcher.pending
+        await batcher.close()
+        assert not batcher._tasks
+        return await request
+
+    assert asyncio.run(run()) == [1]
+    assert calls == [[1]]
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+from concurrent.futures.thread import ThreadPoolExecutor
+
+import pytest
+
+from service.api.exceptions import ServiceOverloadedError
+from service.api.executor import InferenceExecutor
+
+
+def test_cancelled_request_is_counted_until_call_is_done() -> None:
+    inference = InferenceExecutor(
+        ThreadPoolExecutor(max_workers=1), max_workers=1, max_queue=0
+    )
+    started, finish = threading.Event(), threading.Event()
+
+    def work() -> None:
+        started.set()
+        finish.wait(5)
+
+    async def run() -> None:
+        task = asyncio.ensure_future(inference.run(work))
+        await asyncio.get_running_loop().run_in_executor(
+            None, started.wait, 5
+        )
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        # call still runs in executor
+        assert inference.pending == 1
+        with pytest.raises(ServiceOverloadedError):
+            await inference.run(work)
+
+        finish.set()
+        for _ in range(100):
+            if inference.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert inference.pending == 0
+
+    asyncio.run(run())
@@ -0,0 +1,87 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from service.api.middlewares import add_middlewares
+from service.log import access_logger
+
+
+class RecordsHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture
+def access_records():
+    handler = RecordsHandler()
+    level = access_logger.level
+    access_logger.addHandler(handler)
+    access_logger.setLevel(logging.INFO)
+    yield handler.records
+    access_logger.removeHandler(handler)
+    access_logger.setLevel(level)
+
+
+def _make_app(**kwargs) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok() -> dict:
+        return {"status": "ok"}
+
+    @app.get("/fail")
+    async def fail() -> dict:
+        raise RuntimeError("boom")
+
+    add_middlewares(app, **kwargs)
+    return app
+
+
+def test_access_log_fields(access_records) -> None:
+    with TestClient(_make_app()) as client:
+        response = client.get("/ok?x=1")
+    assert response.status_code == HTTPStatus.OK
+
+    record, = access_records
+    assert record.status_code == HTTPStatus.OK
+    assert record.method == "GET"
+    assert str(record.requested_url) == "http://testserver/ok?x=1"
+    assert record.request_time >= 0
+
+
+def test_unhandled_exception_is_server_error(access_records) -> None:
+    with TestClient(_make_app()) as client:
+        response = client.get("/fail")
+    assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+    assert response.json() == {
+        "errors": [{
+            "error_key": "server_error",
+            "error_message": "Internal Server Error",
+            "error_loc": None,
+        }]
+    }
+    assert access_records[0].status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def test_cors_headers() -> None:
+    with TestClient(_make_app()) as client:
+        response = client.get("/ok", headers={"Origin": "http://example.com"})
+    assert response.headers["access-control-allow-origin"] == "*"
+
+
+def test_access_log_is_sampled_by_route(access_records) -> None:
+    app = _make_app(access_sample_rates={"/ok": 0.0, "/fail": 0.0})
+    with TestClient(app) as client:
+        client.get("/ok")
+        client.get("/fail")
+    # server errors are logged regardless of rate
+    assert [record.status_code for record in access_records] == [
+        HTTPStatus.INTERNAL_SERVER_ERROR
+    ]
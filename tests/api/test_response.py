@@ -0,0 +1,27 @@
+import numpy as np
+import orjson
+
+from service.models import Error
+from service.response import create_response, reco_response
+
+
+def test_reco_response_body() -> None:
+    response = reco_response(7, [3, 1, 2])
+    assert response.body == b'{"user_id":7,"items":[3,1,2]}'
+    assert response.media_type == "application/json"
+
+
+def test_error_response_body() -> None:
+    error = Error(
+        error_key="value_error",
+        error_message="Значение",
+        error_loc=("query", np.int64(1)),
+    )
+    response = create_response(422, errors=[error])
+    assert orjson.loads(response.body) == {
+        "errors": [{
+            "error_key": "value_error",
+            "error_message": "Значение",
+            "error_loc": ["query", 1],
+        }]
+    }
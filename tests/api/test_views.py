@@ -1,11 +1,17 @@
+import os
 from http import HTTPStatus
 
+import pytest
 import yaml
+from fastapi import FastAPI
 from starlette.testclient import TestClient
 
 from service.settings import ServiceConfig
+from service.utils.common_artifact import users
+from service.utils.run_reco_pipeline import pipeline
 
 GET_RECO_PATH = "/reco/{model_name}/{user_id}"
+POST_BATCH_RECO_PATH = "/reco/{model_name}/batch"
 with open('./service/envs/authentication_env.yaml') as env_config:
     ENV_TOKEN = yaml.safe_load(env_config)
 
@@ -35,6 +41,55 @@ def test_get_reco_success(
     assert all(isinstance(item_id, int) for item_id in response_json["items"])
 
 
+@pytest.mark.parametrize("model_name", sorted(pipeline.models_config))
+def test_get_reco_for_each_configured_model(
+    client: TestClient,
+    service_config: ServiceConfig,
+    model_name: str,
+) -> None:
+    user_id = 123
+    path = GET_RECO_PATH.format(model_name=model_name, user_id=user_id)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.get(path)
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()["items"]) == service_config.k_recs
+
+
+@pytest.mark.parametrize("model_name", sorted(pipeline.models_config))
+def test_get_reco_for_known_user(
+    client: TestClient,
+    service_config: ServiceConfig,
+    model_name: str,
+) -> None:
+    user_id = int(users[0])
+    path = GET_RECO_PATH.format(model_name=model_name, user_id=user_id)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.get(path)
+    assert response.status_code == HTTPStatus.OK
+    items = response.json()["items"]
+    assert len(items) == service_config.k_recs
+    recs = pipeline.recommend(model_name, user_id, service_config.k_recs)
+    assert items[:len(recs)] == recs
+
+
+@pytest.mark.parametrize("model_name", sorted(pipeline.models_config))
+def test_get_reco_batch_for_known_users(
+    client: TestClient,
+    service_config: ServiceConfig,
+    model_name: str,
+) -> None:
+    user_ids = users[:3].tolist()
+    path = POST_BATCH_RECO_PATH.format(model_name=model_name)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.post(path, json={"user_ids": user_ids})
+    assert response.status_code == HTTPStatus.OK
+    for reco in response.json()["recos"]:
+        assert len(reco["items"]) == service_config.k_recs
+
+
 def test_get_reco_for_unknown_user(
     client: TestClient,
 ) -> None:
@@ -47,6 +102,26 @@ def test_get_reco_for_unknown_user(
     assert response.json()["errors"][0]["error_key"] == "user_not_found"
 
 
+@pytest.mark.parametrize("model_name", sorted(pipeline.models_config))
+def test_get_reco_for_user_id_out_of_int64(
+    client: TestClient,
+    model_name: str,
+) -> None:
+    user_id = -10 ** 20
+    path = GET_RECO_PATH.format(model_name=model_name, user_id=user_id)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        single_response = client.get(path)
+        batch_response = client.post(
+            POST_BATCH_RECO_PATH.format(model_name=model_name),
+            json={"user_ids": [123, user_id]},
+        )
+    for response in (single_response, batch_response):
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        error_key = response.json()["errors"][0]["error_key"]
+        assert error_key == "user_not_found"
+
+
 def test_get_reco_for_unknown_model(
     client: TestClient,
 ) -> None:
@@ -69,3 +144,185 @@ def test_get_reco_with_incorrect_token(
         response = client.get(path)
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json()["errors"][0]["error_key"] == "token_is_not_correct"
+
+
+def test_get_reco_batch_success(
+    client: TestClient,
+    service_config: ServiceConfig,
+) -> None:
+    user_ids = [123, 456, 123]
+    path = POST_BATCH_RECO_PATH.format(model_name="model_hardcode")
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.post(path, json={"user_ids": user_ids})
+    assert response.status_code == HTTPStatus.OK
+    recos = response.json()["recos"]
+    assert [reco["user_id"] for reco in recos] == user_ids
+    for reco in recos:
+        assert len(reco["items"]) == service_config.k_recs
+        assert all(isinstance(item_id, int) for item_id in reco["items"])
+
+
+def test_get_reco_batch_for_unknown_model(
+    client: TestClient,
+) -> None:
+    path = POST_BATCH_RECO_PATH.format(model_name="unknown_model")
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.post(path, json={"user_ids": [123]})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json()["errors"][0]["error_key"] == "model_not_found"
+
+
+def test_get_reco_batch_too_large(
+    client: TestClient,
+    service_config: ServiceConfig,
+) -> None:
+    user_ids = list(range(service_config.max_batch_users + 1))
+    path = POST_BATCH_RECO_PATH.format(model_name="model_hardcode")
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.post(path, json={"user_ids": user_ids})
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert response.json()["errors"][0]["error_key"] == "batch_too_large"
+
+
+def test_get_reco_when_inference_queue_is_full(
+    client: TestClient,
+    app: FastAPI,
+) -> None:
+    inference = app.state.inference
+    inference.pending = inference.max_pending
+    path = GET_RECO_PATH.format(model_name="model_hardcode", user_id=123)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.get(path)
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.json()["errors"][0]["error_key"] == "service_overloaded"
+
+
+def test_get_reco_is_cached(
+    client: TestClient,
+) -> None:
+    path = GET_RECO_PATH.format(model_name="model_hardcode", user_id=123)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        first = client.get(path)
+        second = client.get(path)
+        stats = client.get("/cache/stats").json()
+    assert first.json() == second.json()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_reload_model(
+    app: FastAPI,
+    client: TestClient,
+) -> None:
+    model_name = "lightfm_nmslib"
+    old_model = pipeline.get_model(model_name)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.post(f"/admin/reload?model_name={model_name}")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["reloaded"] == [model_name]
+    assert pipeline.get_model(model_name) is not old_model
+    with open(app.state.reload_marker.path) as marker:
+        requests = marker.read().splitlines()
+    assert requests[-1] == f"{os.getpid()} {model_name}"
+
+
+def test_reload_unknown_model(
+    client: TestClient,
+) -> None:
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.post("/admin/reload?model_name=unknown_model")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json()["errors"][0]["error_key"] == "model_not_found"
+
+
+@pytest.mark.parametrize(
+    "model_name",
+    ["lightfm_nmslib", "userKNN_tfidf_implicit_numpy_online"],
+)
+def test_get_reco_for_new_user_with_history(
+    client: TestClient,
+    model_name: str,
+) -> None:
+    model = pipeline.get_model(model_name)
+    history = [13, 40, 22]
+    path = GET_RECO_PATH.format(model_name=model_name, user_id=10 ** 8)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.get(path, params={"history": history})
+    assert response.status_code == HTTPStatus.OK
+    recs = model.recommend(10 ** 8, 10, history)
+    assert recs and not set(recs) & set(history)
+    assert response.json()["items"][:len(recs)] == recs
+
+
+@pytest.mark.parametrize(
+    "model_name",
+    [
+        "lightfm_nmslib",
+        "userKNN_tfidf_implicit_numpy_online",
+        "blending_tfidf_bmp25_idf_numpy_online",
+    ],
+)
+def test_get_reco_with_history_out_of_int64(
+    client: TestClient,
+    model_name: str,
+) -> None:
+    model = pipeline.get_model(model_name)
+    path = GET_RECO_PATH.format(model_name=model_name, user_id=10 ** 8)
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        response = client.get(path, params={"history": [10 ** 20, 13]})
+        only_unknown = client.get(path, params={"history": [-10 ** 20]})
+    assert response.status_code == HTTPStatus.OK
+    recs = model.recommend(10 ** 8, 10, [13])
+    assert response.json()["items"][:len(recs)] == recs
+    assert only_unknown.status_code == HTTPStatus.OK
+
+
+def test_reco_routes_keep_response_schema(app: FastAPI) -> None:
+    paths = app.openapi()["paths"]
+    for path, method, schema in (
+        (GET_RECO_PATH, "get", "RecoResponse"),
+        (POST_BATCH_RECO_PATH, "post", "BatchRecoResponse"),
+    ):
+        content = paths[path][method]["responses"]["200"]["content"]
+        assert content["application/json"]["schema"] == {
+            "$ref": f"#/components/schemas/{schema}"
+        }
+
+
+def test_alias_is_cached_as_served_model(
+    client: TestClient,
+) -> None:
+    alias_path = GET_RECO_PATH.format(model_name="model_hardcode", user_id=5)
+    model_path = GET_RECO_PATH.format(
+        model_name=pipeline.default_model, user_id=5
+    )
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        client.get(alias_path)
+        client.get(model_path)
+        pipeline.reload(pipeline.default_model)
+        client.get(alias_path)
+        stats = client.get("/cache/stats").json()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_history_of_known_user_is_cached(
+    client: TestClient,
+) -> None:
+    model_name = "lightfm_nmslib"
+    path = GET_RECO_PATH.format(model_name=model_name, user_id=int(users[0]))
+    with client:
+        client.headers = {"Authorization": f"Bearer {ENV_TOKEN['token']}"}
+        first = client.get(path, params={"history": [13, 40]})
+        second = client.get(path, params={"history": [22]})
+        stats = client.get("/cache/stats").json()
+    assert first.json() == second.json()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
@@ -0,0 +1,74 @@
+import json
+import logging.handlers
+import os
+
+from service.log import (
+    JsonFormatter,
+    _use_queue,
+    access_logger,
+    app_logger,
+    setup_logging,
+    stop_logging,
+)
+from service.settings import LogConfig, ServiceConfig
+
+
+def _make_config(**log_config) -> ServiceConfig:
+    return ServiceConfig(log_config=LogConfig(**log_config))
+
+
+def test_json_formatter_keeps_extra_fields() -> None:
+    record = logging.makeLogRecord({
+        "name": "access",
+        "levelname": "INFO",
+        "msg": "user %s",
+        "args": (7,),
+        "status_code": 200,
+        "service_name": "reco_service",
+    })
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "user 7"
+    assert entry["status_code"] == 200
+    assert entry["service_name"] == "reco_service"
+    assert "args" not in entry
+
+
+def test_queue_logging_writes_in_background(capsys) -> None:
+    setup_logging(_make_config(queue=True, json_format=True))
+    try:
+        assert all(
+            isinstance(handler, logging.handlers.QueueHandler)
+            for handler in app_logger.handlers + access_logger.handlers
+        )
+        app_logger.info("Request for model: %s", "popular")
+        access_logger.info("", extra={"status_code": 200})
+    finally:
+        stop_logging()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.split("\n")
+             if line]
+    assert [line["logger"] for line in lines] == ["app", "access"]
+    assert lines[0]["message"] == "Request for model: popular"
+    assert lines[1]["status_code"] == 200
+
+
+def test_queue_logging_writes_in_forked_process(tmp_path) -> None:
+    path_log = tmp_path / "app.log"
+    logger = logging.getLogger("test_fork")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers = [logging.FileHandler(path_log)]
+    _use_queue([logger])
+    try:
+        pid = os.fork()
+        if pid == 0:
+            logger.info("from worker")
+            stop_logging()
+            os._exit(0)  # pylint: disable=protected-access
+        _, status = os.waitpid(pid, 0)
+    finally:
+        stop_logging()
+        logger.handlers = []
+
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert path_log.read_text().splitlines() == ["from worker"]
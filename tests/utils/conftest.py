@@ -0,0 +1,84 @@
+# pylint: disable=redefined-outer-name
+import typing as tp
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+from service.utils.csr import build_csr
+from service.utils.user_knn.reco_userKNN import RecommendUserKNN
+from service.utils.user_knn.user_knn import UserKnn
+
+
+class FakeModel:
+    """
+        Implicit nearest neighbours model with fixed similarity of users.
+    """
+
+    def __init__(self, similarity: np.ndarray):
+        self.similarity = sp.csr_matrix(similarity)
+
+    def fit(self, weights_matrix) -> None:
+        pass
+
+
+@pytest.fixture
+def make_similarity_model() -> tp.Callable[[np.ndarray], FakeModel]:
+    return FakeModel
+
+
+@pytest.fixture
+def similarity_model(
+    make_similarity_model: tp.Callable[[np.ndarray], FakeModel],
+) -> FakeModel:
+    return make_similarity_model(np.array([
+        [1.0, 0.2, 0.7, 0.2],
+        [0.2, 1.0, 0.0, 0.9],
+        [0.0, 0.0, 0.0, 0.0],
+        [0.2, 0.9, 0.5, 1.0],
+    ]))
+
+
+@pytest.fixture
+def make_user_knn(
+    make_similarity_model: tp.Callable[[np.ndarray], FakeModel],
+) -> tp.Callable[[bool], UserKnn]:
+    def make(use_weight_idf: bool) -> UserKnn:
+        train = pd.DataFrame({
+            "user_id": [10, 10, 20, 20, 30, 30],
+            "item_id": [1, 2, 2, 3, 3, 4],
+        })
+        model = make_similarity_model(np.array([
+            [1.0, 0.8, 0.5],
+            [0.8, 1.0, 0.3],
+            [0.5, 0.3, 1.0],
+        ]))
+        user_knn = UserKnn(model, N_users=3, use_weight_idf=use_weight_idf)
+        user_knn.fit(train)
+        return user_knn
+
+    return make
+
+
+@pytest.fixture
+def make_online_reco() -> tp.Callable[
+    [tp.Dict[int, tp.List[int]]], RecommendUserKNN
+]:
+    def make(watched: tp.Dict[int, tp.List[int]]) -> RecommendUserKNN:
+        """
+            Online userKNN with items watched by user index only.
+        """
+        reco = RecommendUserKNN.__new__(RecommendUserKNN)
+        users = np.repeat(list(watched), [len(v) for v in watched.values()])
+        items = [item for row in watched.values() for item in row]
+        watched_indptr, watched_indices = build_csr(
+            users, items, len(watched)
+        )
+        reco.artifact = {
+            "watched_indptr": watched_indptr,
+            "watched_indices": watched_indices,
+        }
+        return reco
+
+    return make
@@ -0,0 +1,63 @@
+import numpy as np
+
+from service.utils.matrix_factorization.ann_index import (
+    CHECKSUM_SUFFIX,
+    get_checksum,
+    get_top_k_checksum,
+    load_or_build_index,
+)
+
+APPROXIMATE_SEARCH = {
+    "space_name": "negdotprod",
+    "method": "hnsw",
+    "index_time_params": {"M": 8, "efConstruction": 50},
+    "query_time_params": {"efSearch": 50},
+}
+
+
+def test_index_is_saved_and_reloaded(tmp_path) -> None:
+    index_path = str(tmp_path / "items.hnsw")
+    embeddings = np.random.default_rng(0).random((50, 4), dtype=np.float32)
+
+    built = load_or_build_index(embeddings, APPROXIMATE_SEARCH, index_path)
+    with open(index_path + CHECKSUM_SUFFIX) as file:
+        assert file.read() == get_checksum(embeddings, APPROXIMATE_SEARCH)
+
+    loaded = load_or_build_index(embeddings, APPROXIMATE_SEARCH, index_path)
+    np.testing.assert_array_equal(
+        built.knnQuery(embeddings[0], k=5)[0],
+        loaded.knnQuery(embeddings[0], k=5)[0],
+    )
+
+
+def test_index_is_rebuilt_for_new_embeddings(tmp_path) -> None:
+    index_path = str(tmp_path / "items.hnsw")
+    rng = np.random.default_rng(0)
+    load_or_build_index(
+        rng.random((50, 4), dtype=np.float32), APPROXIMATE_SEARCH, index_path
+    )
+
+    embeddings = rng.random((60, 4), dtype=np.float32)
+    load_or_build_index(embeddings, APPROXIMATE_SEARCH, index_path)
+    with open(index_path + CHECKSUM_SUFFIX) as file:
+        assert file.read() == get_checksum(embeddings, APPROXIMATE_SEARCH)
+
+
+def test_top_k_checksum_depends_on_seen_items() -> None:
+    rng = np.random.default_rng(0)
+    users = rng.normal(size=(3, 4)).astype(np.float32)
+    items = rng.normal(size=(5, 4)).astype(np.float32)
+    indptr, indices = np.array([0, 1, 1, 2]), np.array([4, 0])
+
+    def checksum(seen) -> str:
+        return get_top_k_checksum(
+            users, items, APPROXIMATE_SEARCH, 10, seen=seen
+        )
+
+    assert checksum(None) != checksum((indptr, indices))
+    assert checksum((indptr, indices)) != checksum(
+        (indptr, np.array([4, 1]))
+    )
+    assert checksum((indptr, indices)) == checksum(
+        (indptr.copy(), indices.copy())
+    )
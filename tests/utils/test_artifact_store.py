@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+from service.utils.artifact_store import ArtifactStore, as_ids
+
+
+def test_artifact_store_save_load(tmp_path) -> None:
+    store = ArtifactStore(str(tmp_path))
+    array = np.arange(10, dtype=np.int32)
+
+    assert not store.exists("users")
+    store.save("users", array)
+    assert store.exists("users")
+
+    loaded = store.load("users")
+    assert isinstance(loaded, np.memmap)
+    assert not loaded.flags.writeable
+    np.testing.assert_array_equal(loaded, array)
+
+
+def test_artifact_store_is_stale_when_source_is_newer(tmp_path) -> None:
+    store = ArtifactStore(str(tmp_path / "store"))
+    source = tmp_path / "source.csv"
+    source.write_text("user_id\n1\n")
+    os.utime(source, (0, 0))
+
+    store.save("users", np.arange(3))
+    assert store.exists("users", sources=[str(source)])
+
+    os.utime(source, None)
+    os.utime(tmp_path / "store" / "users.npy", (0, 0))
+    assert not store.exists("users", sources=[str(source)])
+
+
+def test_as_ids_downcasts_when_ids_fit() -> None:
+    assert as_ids(np.array([1, 2 ** 31 - 1])).dtype == np.int32
+    assert as_ids(np.array([1, 2 ** 31])).dtype == np.int64
@@ -0,0 +1,51 @@
+import typing as tp
+
+import pytest
+import yaml
+
+from service.utils.batch_inference import load_model, run_batch_inference
+from service.utils.matrix_factorization.reco_mf import RecommendMF
+
+
+class FakeModel:
+    def recommend_batch(
+        self,
+        user_ids: tp.List[int],
+        k_recs: int,
+    ) -> tp.List[tp.List[int]]:
+        return [[user_id * 10 + rank for rank in range(k_recs)]
+                for user_id in user_ids]
+
+
+def test_batch_inference_merges_shards(tmp_path) -> None:
+    path = str(tmp_path / "reco.index")
+    index = run_batch_inference(
+        FakeModel(), [3, 1, 2, 3, 5], path, k_recs=2, workers=2, shard_size=2
+    )
+    assert index.users.tolist() == [1, 2, 3, 5]
+    assert index.get_batch([5, 1], k_recs=2) == [[50, 51], [10, 11]]
+    assert not (tmp_path / "reco.index.shards").exists()
+
+
+def test_batch_inference_without_users(tmp_path) -> None:
+    index = run_batch_inference(
+        FakeModel(), [], str(tmp_path / "reco.index"), workers=2
+    )
+    assert len(index) == 0
+    assert index.get_batch([1], k_recs=10) == [[]]
+
+
+def test_load_model_resolves_registered_names(tmp_path) -> None:
+    path = tmp_path / "pipeline.cfg.yml"
+    path.write_text(yaml.safe_dump({
+        "default_model": "mf",
+        "models": {
+            "mf": {
+                "type_model": "matrix_factorization",
+                "config": "./service/config/inference-MF.cfg.yml",
+            },
+        },
+    }))
+    assert isinstance(load_model("popular", str(path)), RecommendMF)
+    with pytest.raises(ValueError):
+        load_model("unknown_model", str(path))
@@ -0,0 +1,18 @@
+import numpy as np
+
+from service.utils.matrix_factorization.fold_in import FoldIn
+
+
+def test_fold_in_scores_history_items_high() -> None:
+    item_embeddings = np.random.default_rng(0).normal(
+        size=(50, 8)
+    ).astype(np.float32)
+    fold_in = FoldIn(item_embeddings, regularization=0.1, alpha=10.0)
+    histories_idx = [np.array([3, 7]), np.array([11])]
+
+    vectors = fold_in.get_vectors(histories_idx)
+    assert vectors.shape == (2, 8)
+    assert vectors.dtype == np.float32
+    for vector, items_idx in zip(vectors, histories_idx):
+        top = np.argsort(-(item_embeddings @ vector))[:10]
+        assert set(items_idx) <= set(top)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from service.utils.csr import build_csr
+from service.utils.user_knn.history_neighbours import HistoryNeighbours
+
+
+def _make_neighbours() -> HistoryNeighbours:
+    # user 0: 10 20, user 1: 10 30 40, user 2: 30, user 3: 50
+    indptr, indices = build_csr(
+        np.array([0, 0, 1, 1, 1, 2, 3]),
+        np.array([10, 20, 10, 30, 40, 30, 50]),
+        4,
+    )
+    return HistoryNeighbours(indptr, indices)
+
+
+def test_neighbours_of_history_are_ordered_by_similarity() -> None:
+    neighbours = _make_neighbours()
+    users, scores = neighbours.get_neighbours([30, 40], k=10)
+    assert users.tolist() == [1, 2]
+    assert scores[0] > scores[1]
+
+
+def test_same_history_is_the_most_similar() -> None:
+    neighbours = _make_neighbours()
+    users, scores = neighbours.get_neighbours([20, 10], k=1)
+    assert users.tolist() == [0]
+    np.testing.assert_allclose(scores, [1.0], rtol=1e-6)
+
+
+def test_unknown_items_have_no_neighbours() -> None:
+    neighbours = _make_neighbours()
+    assert len(neighbours.get_neighbours([60, 5], k=10)[0]) == 0
+    assert len(neighbours.get_neighbours([], k=10)[0]) == 0
+
+
+def test_item_users_are_built_on_first_request() -> None:
+    neighbours = _make_neighbours()
+    assert not hasattr(neighbours, "item_users")
+    neighbours.get_neighbours([10], k=10)
+    assert neighbours.item_users.tolist() == [0, 1, 0, 1, 2, 1, 3]
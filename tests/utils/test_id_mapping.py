@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from service.utils.artifact_store import ArtifactStore
+from service.utils.id_mapping import UNKNOWN, IdMapping
+
+
+@pytest.mark.parametrize("external_ids", [[12, 10, 11, 15], [7, 10 ** 9, 3]])
+def test_id_mapping_round_trip(external_ids) -> None:
+    mapping = IdMapping(np.array(external_ids))
+    inner = mapping.to_inner(external_ids)
+    np.testing.assert_array_equal(inner, np.arange(len(external_ids)))
+    assert mapping.to_external(inner).tolist() == external_ids
+    assert external_ids[0] in mapping
+    assert len(mapping) == len(external_ids)
+
+
+def test_id_mapping_kinds() -> None:
+    assert "dense" in IdMapping(np.array([12, 10, 11, 15])).lookup
+    assert "sorted_ids" in IdMapping(np.array([7, 10 ** 9, 3])).lookup
+
+
+@pytest.mark.parametrize("external_ids", [[12, 10, 11, 15], [7, 10 ** 9, 3]])
+def test_id_mapping_unknown_ids(external_ids) -> None:
+    mapping = IdMapping(np.array(external_ids))
+    unknown = [-5, 0, 9, 14, 16, 10 ** 10]
+    assert mapping.to_inner(unknown).tolist() == [UNKNOWN] * len(unknown)
+    assert 14 not in mapping
+
+
+def test_id_mapping_empty() -> None:
+    mapping = IdMapping(np.array([], dtype=np.int64))
+    assert mapping.to_inner([1, 2]).tolist() == [UNKNOWN, UNKNOWN]
+
+
+def test_id_mapping_save_load(tmp_path) -> None:
+    store = ArtifactStore(str(tmp_path))
+    IdMapping(np.array([7, 10 ** 9, 3])).save(store, "users")
+    mapping = IdMapping.load(store, "users")
+    assert isinstance(mapping.lookup["sorted_ids"], np.memmap)
+    assert mapping.to_inner([3, 7, 8]).tolist() == [2, 0, UNKNOWN]
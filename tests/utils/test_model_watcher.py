@@ -0,0 +1,87 @@
+import os
+import typing as tp
+from pathlib import Path
+
+from service.utils.model_watcher import (
+    ModelWatcher,
+    ReloadMarker,
+    get_artifact_files,
+)
+
+
+class FakePipeline:
+    def __init__(self, path_config: str):
+        self.models_config = {"model": {"config": path_config}}
+        self.reloads: tp.List[tp.Optional[str]] = []
+
+    def loaded_models(self) -> tp.List[str]:
+        return ["model"]
+
+    def reload(self, model_name: tp.Optional[str] = None) -> tp.List[str]:
+        self.reloads.append(model_name)
+        return ["model"]
+
+
+def _make_config(tmp_path: Path) -> tp.Tuple[Path, Path]:
+    weights = tmp_path / "weights.npy"
+    weights.write_bytes(b"v1")
+    config = tmp_path / "model.cfg.yml"
+    config.write_text(
+        f"artifact:\n  weights: {weights}\n  missing: {tmp_path / 'nope'}\n"
+    )
+    return config, weights
+
+
+def test_get_artifact_files(tmp_path: Path) -> None:
+    config, weights = _make_config(tmp_path)
+    assert get_artifact_files(str(config)) == [str(config), str(weights)]
+
+
+def test_watcher_reloads_changed_model(tmp_path: Path) -> None:
+    config, weights = _make_config(tmp_path)
+    pipeline = FakePipeline(str(config))
+    watcher = ModelWatcher(pipeline, interval_s=60)
+    assert watcher.check() == []
+
+    stat = weights.stat()
+    os.utime(weights, (stat.st_atime, stat.st_mtime + 10))
+    assert watcher.check() == ["model"]
+    assert watcher.check() == []
+    assert pipeline.reloads == ["model"]
+
+
+def test_reload_marker_skips_own_and_unfinished_requests(
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "reload.marker"
+    path.write_text("1 old_request\n")
+    marker = ReloadMarker(str(path))
+    assert marker.check() == []
+
+    marker.notify("model")
+    with open(path, "a") as other_worker:
+        other_worker.write("1 model\n1 \n1 unfinished")
+    assert marker.check() == ["model", None]
+    with open(path, "a") as other_worker:
+        other_worker.write("\n")
+    assert marker.check() == ["unfinished"]
+    assert marker.check() == []
+
+
+def test_watcher_reloads_models_requested_by_other_workers(
+    tmp_path: Path,
+) -> None:
+    config, _ = _make_config(tmp_path)
+    pipeline = FakePipeline(str(config))
+    path = tmp_path / "reload.marker"
+    watcher = ModelWatcher(
+        pipeline,
+        interval_s=60,
+        marker=ReloadMarker(str(path)),
+        watch_artifacts=False,
+    )
+    path.write_text("1 model\n1 not_loaded_model\n1 model\n")
+    assert watcher.check() == ["model"]
+    path.write_text(path.read_text() + "1 model\n1 \n")
+    assert watcher.check() == ["model"]
+    assert pipeline.reloads == ["model", None]
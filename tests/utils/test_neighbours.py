@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from service.utils.user_knn.neighbours import NeighbourMatrix
+
+
+def test_neighbours_are_sorted_and_pruned(similarity_model) -> None:
+    neighbours = NeighbourMatrix.from_model(similarity_model, n_neighbours=3)
+    assert neighbours.indptr.tolist() == [0, 3, 6, 6, 9]
+    assert neighbours.indices.tolist() == [0, 2, 1, 1, 3, 0, 3, 1, 2]
+    assert neighbours.indices.dtype == np.int32
+    assert neighbours.scores.dtype == np.float32
+
+
+def test_neighbours_get_rows(similarity_model) -> None:
+    neighbours = NeighbourMatrix.from_model(similarity_model)
+    rows, indices, scores, bounds = neighbours.get_rows(np.array([3, 2, 0]), 2)
+    assert rows.tolist() == [0, 0, 2, 2]
+    assert indices.tolist() == [3, 1, 0, 2]
+    np.testing.assert_allclose(scores, [1.0, 0.9, 1.0, 0.7])
+    assert bounds.tolist() == [0, 2, 2, 4]
+
+
+def test_pruned_neighbours_refuse_deeper_rows(similarity_model) -> None:
+    neighbours = NeighbourMatrix.from_model(similarity_model, n_neighbours=2)
+    assert neighbours.get_rows(np.array([0]), 2)[1].tolist() == [0, 2]
+    with pytest.raises(ValueError):
+        neighbours.get_rows(np.array([0]), 3)
+
+
+def test_neighbours_keep_scores_below_one(make_similarity_model) -> None:
+    model = make_similarity_model(np.array([[1 - 1e-12, 0.5]]))
+    neighbours = NeighbourMatrix.from_model(model)
+    assert neighbours.scores[0] < 1
+
+
+def test_neighbours_save_load(tmp_path, similarity_model) -> None:
+    path = str(tmp_path / "model.knn")
+    NeighbourMatrix.from_model(similarity_model, n_neighbours=2).save(path)
+    neighbours = NeighbourMatrix.load(path)
+    assert isinstance(neighbours.indices, np.memmap)
+    assert neighbours.meta["n_neighbours"] == 2
+    assert neighbours.indices.tolist() == [0, 2, 1, 3, 3, 1]
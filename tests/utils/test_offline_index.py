@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+
+from service.utils.offline_index import OfflineRecoIndex
+
+
+def _make_index() -> OfflineRecoIndex:
+    reco = pd.DataFrame({
+        "user_id": [7, 3, 7, 3, 7],
+        "item_id": [70, 31, 71, 30, 72],
+        "rank": [1, 2, 2, 1, 3],
+    })
+    return OfflineRecoIndex.from_frame(reco)
+
+
+def test_offline_index_keeps_rank_order() -> None:
+    index = _make_index()
+    assert len(index) == 2
+    assert index.get(3, k_recs=10) == [30, 31]
+    assert index.get(7, k_recs=2) == [70, 71]
+    assert index.get(5, k_recs=10) == []
+
+
+def test_offline_index_batch_matches_single() -> None:
+    index = _make_index()
+    user_ids = [7, 100, 3, 1, 7]
+    assert index.get_batch(user_ids, k_recs=2) == [
+        index.get(user_id, k_recs=2) for user_id in user_ids
+    ]
+
+
+def test_offline_index_save_load(tmp_path) -> None:
+    path = str(tmp_path / "reco.index")
+    _make_index().save(path)
+    index = OfflineRecoIndex.load(path)
+    assert index.get(7, k_recs=10) == [70, 71, 72]
+    assert index.items.dtype.name == "int32"
+
+
+def test_offline_index_rebuilt_when_csv_is_newer(tmp_path) -> None:
+    path_index = str(tmp_path / "reco.index")
+    path_csv = tmp_path / "reco.csv"
+    pd.DataFrame(
+        {"user_id": [1], "item_id": [10], "rank": [1]}
+    ).to_csv(path_csv, index=False)
+    _make_index().save(path_index)
+    os.utime(path_index, (0, 0))
+
+    index = OfflineRecoIndex.load_or_build(path_index, str(path_csv))
+    assert index.get(1, k_recs=10) == [10]
+    assert OfflineRecoIndex.load(path_index).get(7, k_recs=10) == []
+
+
+def test_offline_index_from_lists_and_merge() -> None:
+    first = OfflineRecoIndex.from_lists([7, 3], [[70, 71, 72], [30, 31]])
+    second = OfflineRecoIndex.from_lists([5, 1], [[], [10]])
+    index = OfflineRecoIndex.merge([first, second])
+
+    assert index.users.tolist() == [1, 3, 5, 7]
+    assert index.get_batch([7, 3, 5, 1], k_recs=10) == [
+        [70, 71, 72], [30, 31], [], [10]
+    ]
+
+
+def test_offline_index_to_frame_round_trip() -> None:
+    index = _make_index()
+    reco = index.to_frame()
+    assert reco["user_id"].tolist() == [3, 3, 7, 7, 7]
+    assert reco["rank"].tolist() == [1, 2, 1, 2, 3]
+    assert OfflineRecoIndex.from_frame(reco).get(7, k_recs=10) == [70, 71, 72]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from service.utils.popular.popular_fallback import (
+    PopularFallback,
+    build_segments,
+)
+
+POPULAR = np.array([10, 11, 12, 13, 14])
+
+
+def test_fill_keeps_order_of_recs_and_popular() -> None:
+    fallback = PopularFallback(POPULAR)
+    assert fallback.fill([12, 3, 10], k_recs=5) == [12, 3, 10, 11, 13]
+    assert fallback.fill([1, 2], k_recs=2) == [1, 2]
+
+
+def test_fill_returns_what_popular_has() -> None:
+    fallback = PopularFallback(POPULAR)
+    assert fallback.fill([10, 1], k_recs=10) == [10, 1, 11, 12, 13, 14]
+    assert fallback.fill([], k_recs=10) == POPULAR.tolist()
+
+
+def test_fill_uses_popular_of_user_segment() -> None:
+    segments = build_segments(
+        POPULAR,
+        pd.DataFrame({"user_id": [1, 2, 3], "segment": ["a", "b", "c"]}),
+        pd.DataFrame({"segment": ["b", "a", "a"], "item_id": [20, 21, 12]}),
+    )
+    fallback = PopularFallback(POPULAR, segments)
+
+    assert fallback.fill([], k_recs=4, user_id=1) == [21, 12, 10, 11]
+    assert fallback.fill([10], k_recs=3, user_id=2) == [10, 20, 11]
+    # segment without popular items and unknown user
+    assert fallback.fill([], k_recs=2, user_id=3) == [10, 11]
+    assert fallback.fill([], k_recs=2, user_id=4) == [10, 11]
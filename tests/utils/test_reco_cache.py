@@ -0,0 +1,51 @@
+import time
+
+from service.utils.reco_cache import RecoCache, _entry_size
+
+
+def test_reco_cache_counts_hits_and_misses() -> None:
+    cache = RecoCache(max_entries=10, ttl_s=60, max_bytes=10 ** 6)
+    assert cache.get(("model", 1, 3)) is None
+    cache.put(("model", 1, 3), [1, 2, 3])
+    assert cache.get(("model", 1, 3)) == [1, 2, 3]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_reco_cache_evicts_least_recently_used() -> None:
+    cache = RecoCache(max_entries=2, ttl_s=60, max_bytes=10 ** 6)
+    cache.put(("model", 1, 1), [1])
+    cache.put(("model", 2, 1), [2])
+    cache.get(("model", 1, 1))
+    cache.put(("model", 3, 1), [3])
+    assert cache.get(("model", 2, 1)) is None
+    assert cache.get(("model", 1, 1)) == [1]
+    assert cache.get(("model", 3, 1)) == [3]
+
+
+def test_reco_cache_respects_memory_cap() -> None:
+    max_bytes = 2 * _entry_size(tuple(range(10)))
+    cache = RecoCache(max_entries=100, ttl_s=60, max_bytes=max_bytes)
+    for user_id in range(5):
+        cache.put(("model", user_id, 10), list(range(10)))
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] <= max_bytes
+
+
+def test_reco_cache_expires_entries() -> None:
+    cache = RecoCache(max_entries=10, ttl_s=0.01, max_bytes=10 ** 6)
+    cache.put(("model", 1, 1), [1])
+    time.sleep(0.02)
+    assert cache.get(("model", 1, 1)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_reco_cache_invalidates_model() -> None:
+    cache = RecoCache(max_entries=10, ttl_s=60, max_bytes=10 ** 6)
+    cache.put(("model_1", 1, 1), [1])
+    cache.put(("model_2", 1, 1), [2])
+    cache.invalidate("model_1")
+    assert cache.get(("model_1", 1, 1)) is None
+    assert cache.get(("model_2", 1, 1)) == [2]
+    cache.invalidate()
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,33 @@
+import numpy as np
+
+from service.utils.user_knn.download_artifact_userKNN import NO_IDF_RANK
+from service.utils.user_knn.reco_userKNN import RecommendUserKNN
+
+
+def _make_reco(blending_type: str) -> RecommendUserKNN:
+    reco = RecommendUserKNN.__new__(RecommendUserKNN)
+    # items in idf order: 5, 2, 9, 1; item 7 has no idf
+    item_idf_rank = np.full(10, NO_IDF_RANK, dtype=np.int32)
+    item_idf_rank[[5, 2, 9, 1]] = np.arange(4)
+    reco.artifact = {
+        "item_idf_rank": item_idf_rank,
+        "blending_type": blending_type,
+        "blending_weights": [0.5, 0.5],
+    }
+    return reco
+
+
+def test_blend_idf_orders_union_by_idf() -> None:
+    reco = _make_reco("idf")
+    recs_tfidf = (np.array([1, 2, 7]), np.array([0.9, 0.8, 0.7]))
+    recs_bmp = (np.array([9, 1, 12]), np.array([3.0, 2.0, 1.0]))
+    assert reco._blend(recs_tfidf, recs_bmp, 10).tolist() == [2, 9, 1]
+    assert reco._blend(recs_tfidf, recs_bmp, 2).tolist() == [2, 9]
+
+
+def test_blend_weighted_sums_normalized_scores() -> None:
+    reco = _make_reco("weighted")
+    recs_tfidf = (np.array([1, 2, 7]), np.array([1.0, 0.5, 0.5]))
+    recs_bmp = (np.array([9, 1]), np.array([4.0, 2.0]))
+    # 1: 0.5 + 0.25, 9: 0.5, 2 and 7: 0.25 ordered by idf
+    assert reco._blend(recs_tfidf, recs_bmp, 10).tolist() == [1, 9, 2, 7]
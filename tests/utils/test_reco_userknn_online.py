@@ -0,0 +1,80 @@
+import typing as tp
+
+import numpy as np
+import pytest
+
+from service.utils.user_knn.neighbours import NeighbourMatrix
+
+SIMILARITY = np.array([
+    [1.0, 0.3, 0.8, 0.1],
+    [0.3, 1.0, 0.0, 0.6],
+    [0.8, 0.0, 1.0, 0.4],
+    [0.1, 0.6, 0.4, 1.0],
+])
+WATCHED = {0: [5, 6], 1: [6, 7, 8], 2: [9, 5], 3: [8, 10]}
+
+
+def _reference(
+    user: int,
+    k_recs: int,
+    bmp: bool,
+) -> tp.Tuple[tp.List[int], tp.List[int]]:
+    """
+        Previous implementation: top of similarity row filtered
+        by python predicates, history of dict of lists.
+    """
+    row = SIMILARITY[user]
+    sim_users = [
+        (other, row[other])
+        for other in sorted(np.flatnonzero(row), key=lambda u: -row[u])
+    ][:k_recs]
+    if bmp:
+        sim_users = [(u, s) for u, s in sim_users if u != user]
+    else:
+        sim_users = [(u, s) for u, s in sim_users if s < 1]
+
+    recs: tp.List[int] = []
+    for sim_user, _ in sim_users:
+        recs.extend(item for item in WATCHED[sim_user] if item not in recs)
+    return [u for u, _ in sim_users], recs[:k_recs]
+
+
+def test_sim_users_and_watched_items_by_hand(
+    make_similarity_model,
+    make_online_reco,
+) -> None:
+    reco = make_online_reco(WATCHED)
+    model = NeighbourMatrix.from_model(make_similarity_model(SIMILARITY))
+    (sim_users, sim_scores), = reco._get_sim_users(
+        np.array([0]), 3, model, bmp=False
+    )
+    # top 3 of row 0: itself, 2, 1
+    assert sim_users.tolist() == [2, 1]
+    np.testing.assert_allclose(sim_scores, [0.8, 0.3])
+
+    recs, scores = reco._get_watched_items(sim_users, sim_scores, 3)
+    assert recs.tolist() == [9, 5, 6]
+    np.testing.assert_allclose(scores, [0.8, 0.8, 0.3])
+
+
+@pytest.mark.parametrize("bmp", [False, True])
+@pytest.mark.parametrize("k_recs", [1, 2, 3, 4])
+def test_online_reco_matches_previous_implementation(
+    make_similarity_model,
+    make_online_reco,
+    bmp: bool,
+    k_recs: int,
+) -> None:
+    reco = make_online_reco(WATCHED)
+    model = NeighbourMatrix.from_model(make_similarity_model(SIMILARITY))
+    users_idx = np.arange(len(WATCHED))
+    sim_users = reco._get_sim_users(users_idx, k_recs, model, bmp)
+    online_reco = reco._get_online_reco(
+        users_idx, k_recs, model=model, bmp=bmp
+    )
+    for user, (neighbours, _), (recs, _) in zip(
+        users_idx, sim_users, online_reco
+    ):
+        expected_users, expected_recs = _reference(user, k_recs, bmp)
+        assert neighbours.tolist() == expected_users
+        assert recs.tolist() == expected_recs
@@ -0,0 +1,62 @@
+import typing as tp
+
+import numpy as np
+import pytest
+import yaml
+
+from service.utils.run_reco_pipeline import MainPipeline
+
+
+def test_listeners_are_called_on_reload_only(tmp_path) -> None:
+    path = tmp_path / "pipeline.cfg.yml"
+    path.write_text(yaml.safe_dump({
+        "default_model": "mf",
+        "lazy_load": True,
+        "models": {
+            "mf": {
+                "type_model": "matrix_factorization",
+                "config": "./service/config/inference-MF.cfg.yml",
+            },
+            "knn": {
+                "type_model": "user_knn",
+                "config": "./service/config/inference-userKNN-tfidf.cfg.yml",
+            },
+        },
+    }))
+    pipeline = MainPipeline(str(path))
+    reloaded: tp.List[str] = []
+    pipeline.add_reload_listener(reloaded.append)
+
+    pipeline.get_model("knn")
+    assert reloaded == []
+
+    pipeline.reload("knn")
+    assert reloaded == ["knn"]
+
+
+def test_reload_keeps_model_with_mismatched_embeddings(tmp_path) -> None:
+    with open("./service/config/inference-MF.cfg.yml") as config:
+        params = yaml.safe_load(config)
+    params["scorer"] = "exact"
+    path_config = tmp_path / "mf.cfg.yml"
+    path_config.write_text(yaml.safe_dump(params))
+    path = tmp_path / "pipeline.cfg.yml"
+    path.write_text(yaml.safe_dump({
+        "default_model": "mf",
+        "models": {
+            "mf": {
+                "type_model": "matrix_factorization",
+                "config": str(path_config),
+            },
+        },
+    }))
+    pipeline = MainPipeline(str(path))
+    model = pipeline.get_model("mf")
+
+    path_users = tmp_path / "users.npy"
+    np.save(path_users, np.load(params["user_embeddings"])[:-1])
+    params["user_embeddings"] = str(path_users)
+    path_config.write_text(yaml.safe_dump(params))
+    with pytest.raises(ValueError):
+        pipeline.reload("mf")
+    assert pipeline.get_model("mf") is model
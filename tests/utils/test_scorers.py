@@ -0,0 +1,89 @@
+import numpy as np
+
+from service.utils.matrix_factorization.scorers import (
+    ExactScorer,
+    NmslibScorer,
+    query_top_k,
+)
+
+PARAMS = {
+    "approximate_search": {
+        "space_name": "negdotprod",
+        "method": "hnsw",
+        "index_time_params": {"M": 8, "efConstruction": 50},
+        "query_time_params": {"efSearch": 50},
+    },
+    "exact_search": {"batch_size": 3},
+}
+
+
+def _make_embeddings():
+    rng = np.random.default_rng(0)
+    return (
+        rng.random((7, 4), dtype=np.float32),
+        rng.random((50, 4), dtype=np.float32),
+    )
+
+
+def test_exact_scorer_returns_sorted_top_k() -> None:
+    users, items = _make_embeddings()
+    recs = ExactScorer(items, PARAMS).query_batch(users, k=5)
+
+    expected = np.argsort(-(users @ items.T), axis=1)[:, :5]
+    np.testing.assert_array_equal(np.stack(recs), expected)
+
+
+def test_exact_scorer_excludes_items() -> None:
+    users, items = _make_embeddings()
+    scorer = ExactScorer(items, PARAMS)
+    first = scorer.query_batch(users, k=5)
+    exclude = [top[:2] for top in first]
+
+    recs = scorer.query_batch(users, k=5, exclude=exclude)
+    for top, user_recs, excluded in zip(first, recs, exclude):
+        assert len(user_recs) == 5
+        assert not np.isin(user_recs, excluded).any()
+        np.testing.assert_array_equal(user_recs[:3], top[2:])
+
+
+def test_exact_scorer_returns_less_when_items_run_out() -> None:
+    users, items = _make_embeddings()
+    exclude = [np.arange(48, dtype=np.int32)] * len(users)
+
+    recs = ExactScorer(items, PARAMS).query_batch(users, k=5, exclude=exclude)
+    assert all(sorted(user_recs) == [48, 49] for user_recs in recs)
+
+
+def test_query_top_k_matches_scorer() -> None:
+    users, items = _make_embeddings()
+    scorer = NmslibScorer(items, PARAMS)
+
+    top_k = query_top_k(scorer, users, k=5, batch_size=3)
+    assert top_k.shape == (7, 5)
+    assert top_k.dtype == np.int32
+    for row, user_recs in zip(top_k, scorer.query_batch(users, k=5)):
+        np.testing.assert_array_equal(row, user_recs)
+
+
+def test_nmslib_scorer_grows_k_only_when_filtered_out(monkeypatch) -> None:
+    users, items = _make_embeddings()
+    scorer = NmslibScorer(items, PARAMS)
+    first = scorer.query_batch(users, k=5)
+
+    queries = []
+    query = scorer._query  # pylint: disable=protected-access
+
+    def counted_query(vectors, k):
+        queries.append((len(vectors), k))
+        return query(vectors, k)
+
+    monkeypatch.setattr(scorer, "_query", counted_query)
+
+    exclude = [np.array([], dtype=np.int32)] * len(users)
+    exclude[0] = first[0]
+    recs = scorer.query_batch(users, k=5, exclude=exclude)
+    assert [count for count, _ in queries] == [len(users), 1]
+    assert queries[1][1] >= 10
+    for user_recs, excluded in zip(recs, exclude):
+        assert len(user_recs) == 5
+        assert not np.isin(user_recs, excluded).any()
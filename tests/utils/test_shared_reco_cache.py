@@ -0,0 +1,81 @@
+import os
+import typing as tp
+
+import pytest
+
+from service.utils import shared_reco_cache
+from service.utils.shared_reco_cache import SharedRecoCache
+
+
+@pytest.fixture
+def cache_name() -> tp.Iterator[str]:
+    name = f"test_reco_cache_{os.getpid()}"
+    yield name
+    SharedRecoCache.unlink(name)
+
+
+def test_shared_cache_is_visible_to_other_instances(cache_name: str) -> None:
+    writer = SharedRecoCache(cache_name, n_slots=64, max_k=5, ttl_s=60)
+    reader = SharedRecoCache(cache_name, n_slots=64, max_k=5, ttl_s=60)
+    assert reader.get(("model", 1, 3)) is None
+    writer.put(("model", 1, 3), [7, 8, 9])
+    assert reader.get(("model", 1, 3)) == [7, 8, 9]
+    assert reader.get(("model", 1, 5)) is None
+    assert reader.get(("other_model", 1, 3)) is None
+    stats = reader.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 1)
+
+
+def test_shared_cache_replaces_entry(cache_name: str) -> None:
+    cache = SharedRecoCache(cache_name, n_slots=64, max_k=5, ttl_s=60)
+    cache.put(("model", 1, 3), [7, 8, 9])
+    cache.put(("model", 1, 3), [1, 2])
+    assert cache.get(("model", 1, 3)) == [1, 2]
+    assert cache.stats()["entries"] == 1
+
+
+def test_shared_cache_invalidates_in_all_instances(cache_name: str) -> None:
+    first = SharedRecoCache(cache_name, n_slots=64, max_k=5, ttl_s=60)
+    second = SharedRecoCache(cache_name, n_slots=64, max_k=5, ttl_s=60)
+    first.put(("model_1", 1, 1), [1])
+    first.put(("model_2", 1, 1), [2])
+    second.invalidate("model_1")
+    assert first.get(("model_1", 1, 1)) is None
+    assert first.get(("model_2", 1, 1)) == [2]
+    second.invalidate()
+    assert first.get(("model_2", 1, 1)) is None
+
+
+def test_shared_cache_skips_torn_slot(cache_name: str) -> None:
+    cache = SharedRecoCache(cache_name, n_slots=64, max_k=5, ttl_s=60)
+    cache.put(("model", 1, 3), [7, 8, 9])
+    cache._items[:, 0] += 1  # pylint: disable=protected-access
+    assert cache.get(("model", 1, 3)) is None
+
+
+def test_shared_cache_skips_slot_written_concurrently(
+    cache_name: str,
+    monkeypatch,
+) -> None:
+    first = SharedRecoCache(cache_name, n_slots=1, max_k=5, ttl_s=60)
+    second = SharedRecoCache(cache_name, n_slots=1, max_k=5, ttl_s=60)
+    # pylint: disable=protected-access
+    crc = shared_reco_cache._crc
+
+    def crc_after_other_writer(meta, items):
+        # second writer has written only meta of its entry
+        # when the first one computes crc
+        monkeypatch.setattr(shared_reco_cache, "_crc", crc)
+        second._meta[0, shared_reco_cache.USER] = 2
+        return crc(meta, items)
+
+    monkeypatch.setattr(shared_reco_cache, "_crc", crc_after_other_writer)
+    first.put(("m", 1, 3), [11, 12, 13])
+    assert second.get(("m", 2, 3)) is None
+    assert second.get(("m", 1, 3)) is None
+
+
+def test_shared_cache_rejects_other_layout(cache_name: str) -> None:
+    SharedRecoCache(cache_name, n_slots=64, max_k=5, ttl_s=60)
+    with pytest.raises(ValueError):
+        SharedRecoCache(cache_name, n_slots=32, max_k=5, ttl_s=60)
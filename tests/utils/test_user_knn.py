@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+
+def test_user_knn_predict_without_idf(make_user_knn) -> None:
+    user_knn = make_user_knn(use_weight_idf=False)
+    test = pd.DataFrame({"user_id": [10, 99]})
+    recs = user_knn.predict(test, N_recs=3, bmp25=True)
+    # neighbours of 10 are 20 (0.8) and 30 (0.5), self is dropped
+    assert recs["user_id"].tolist() == [10, 10, 10]
+    assert recs["item_id"].tolist() == [2, 3, 4]
+    np.testing.assert_allclose(recs["score"], [0.8, 0.8, 0.5])
+    assert recs["rank"].tolist() == [1, 2, 3]
+
+
+def test_user_knn_predict_weights_items_by_idf(make_user_knn) -> None:
+    user_knn = make_user_knn(use_weight_idf=True)
+    recs = user_knn.predict(pd.DataFrame({"user_id": [10]}), N_recs=3)
+    # self similarity 1 is dropped, idf(n, x) = log((1 + n) / (1 + x) + 1)
+    assert recs["item_id"].tolist() == [2, 3, 4]
+    np.testing.assert_allclose(
+        recs["score"],
+        [0.8 * np.log(7 / 3 + 1), 0.8 * np.log(7 / 3 + 1), 0.5 * np.log(4.5)],
+    )
+
+
+def test_user_knn_predict_in_chunks(tmp_path, make_user_knn) -> None:
+    user_knn = make_user_knn(use_weight_idf=True)
+    test = pd.DataFrame({"user_id": [30, 10, 20]})
+    recs = user_knn.predict(test, chunk_size=3)
+    pd.testing.assert_frame_equal(user_knn.predict(test, chunk_size=1), recs)
+
+    path = tmp_path / "recs.csv"
+    user_knn.predict_to_csv(str(path), test["user_id"], chunk_size=2)
+    pd.testing.assert_frame_equal(pd.read_csv(path), recs, check_dtype=False)